@@ -0,0 +1,47 @@
+class FadeAnimator:
+    """Fades a window in or out with Tk after() steps, never blocking the event loop"""
+
+    def __init__(self, window, max_alpha=0.95, steps=10, interval=10):
+        self.window = window
+        self.max_alpha = max_alpha
+        self.steps = steps
+        self.interval = interval  # ms between steps
+        self.enabled = True  # When False every fade completes immediately
+        self.after_id = None
+
+    def fade_in(self, on_done=None):
+        """Fade from transparent to max_alpha"""
+        self._start(0.0, self.max_alpha, on_done)
+
+    def fade_out(self, on_done=None):
+        """Fade from the current alpha to transparent"""
+        try:
+            current = float(self.window.attributes("-alpha"))
+        except Exception:
+            current = self.max_alpha
+        self._start(current, 0.0, on_done)
+
+    def cancel(self):
+        """Stop the running fade where it is"""
+        if self.after_id is not None:
+            self.window.after_cancel(self.after_id)
+            self.after_id = None
+
+    def _start(self, start, end, on_done):
+        self.cancel()
+        if not self.enabled:
+            self.window.attributes("-alpha", end)
+            if on_done:
+                on_done()
+            return
+        self._step(start, end, 1, on_done)
+
+    def _step(self, start, end, step, on_done):
+        """Apply one step and schedule the next"""
+        self.window.attributes("-alpha", start + (end - start) * step / self.steps)
+        if step >= self.steps:
+            self.after_id = None
+            if on_done:
+                on_done()
+            return
+        self.after_id = self.window.after(self.interval, self._step, start, end, step + 1, on_done)
@@ -0,0 +1,16 @@
+import os
+
+# Folder that holds the app's caches and logs
+APP_DIR_NAME = ".fix-my-english"
+
+
+def get_data_dir():
+    """Return the per-user data directory, creating it if needed"""
+    base = os.environ.get("FIX_MY_ENGLISH_HOME") or os.path.join(os.path.expanduser("~"), APP_DIR_NAME)
+    os.makedirs(base, exist_ok=True)
+    return base
+
+
+def data_path(name):
+    """Return the path of a file inside the data directory"""
+    return os.path.join(get_data_dir(), name)
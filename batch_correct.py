@@ -0,0 +1,288 @@
+import json
+import os
+import sys
+from collections import deque
+
+from correction_engine import CorrectionEngine, create_model
+from model_router import POLICIES, ModelRouter, parse_models
+
+# Input formats: one record per paragraph, per non-empty line, or per JSON line
+FORMATS = ('paragraphs', 'lines', 'jsonl')
+
+
+class BatchRecord:
+    """One unit of text to correct, with the JSON object it came from (jsonl only)"""
+
+    def __init__(self, text, data=None):
+        self.text = text
+        self.data = data
+
+
+def open_input(path):
+    """Open an input path, "-" meaning stdin"""
+    if path == '-':
+        return sys.stdin
+    return open(path, 'r', encoding='utf-8')
+
+
+def detect_format(paths):
+    """jsonl when every input ends in .jsonl, paragraphs otherwise"""
+    if paths and all(path.endswith('.jsonl') for path in paths):
+        return 'jsonl'
+    return 'paragraphs'
+
+
+def read_records(paths, input_format, field='text'):
+    """Yield BatchRecords lazily from the input files in order"""
+    for path in paths:
+        f = open_input(path)
+        try:
+            if input_format == 'jsonl':
+                yield from _read_jsonl(f, field)
+            elif input_format == 'lines':
+                for line in f:
+                    if line.strip():
+                        yield BatchRecord(line.strip())
+            else:
+                yield from _read_paragraphs(f)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def _read_jsonl(f, field):
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        data = json.loads(line)
+        text = data.get(field) if isinstance(data, dict) else None
+        if not isinstance(text, str):
+            raise ValueError(f"line {number}: no string field '{field}'")
+        yield BatchRecord(text, data)
+
+
+def _read_paragraphs(f):
+    paragraph = []
+    for line in f:
+        if line.strip():
+            paragraph.append(line.strip())
+        elif paragraph:
+            yield BatchRecord(" ".join(paragraph))
+            paragraph = []
+    if paragraph:
+        yield BatchRecord(" ".join(paragraph))
+
+
+def format_result(record, input_format, corrected, error=None, output_field='corrected'):
+    """Return the output text for one finished record"""
+    if input_format == 'jsonl':
+        data = dict(record.data)
+        data[output_field] = corrected
+        if error is not None:
+            data['error'] = str(error)
+        return json.dumps(data, ensure_ascii=False) + "\n"
+    separator = "\n\n" if input_format == 'paragraphs' else "\n"
+    # A record that failed is passed through unchanged so the output stays aligned
+    return (corrected if error is None else record.text) + separator
+
+
+class Checkpoint:
+    """Progress of a batch job: rows done and the output size that holds them
+
+    Written atomically next to the output file, so after a crash the output
+    can be truncated back to the last checkpoint and the job resumed from
+    the next unfinished row.
+    """
+
+    def __init__(self, path, inputs, input_format):
+        self.path = path
+        self.inputs = [os.path.abspath(p) if p != '-' else p for p in inputs]
+        self.input_format = input_format
+        self.done = 0
+        self.output_bytes = 0
+
+    def load(self):
+        """Read a saved checkpoint for the same job; return False if there is none"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('inputs') != self.inputs or data.get('format') != self.input_format:
+            raise ValueError(f"{self.path} belongs to a different job; remove it or drop --resume")
+        self.done = data['done']
+        self.output_bytes = data['output_bytes']
+        return True
+
+    def save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'inputs': self.inputs, 'format': self.input_format,
+                       'done': self.done, 'output_bytes': self.output_bytes}, f)
+        os.replace(temp_path, self.path)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def run_batch(engine, records, out, input_format, window=16, checkpoint=None, checkpoint_every=100,
+              output_field='corrected', on_progress=None):
+    """Correct records through the engine and write results to out in input order
+
+    At most window records are in flight or waiting to be written, so
+    memory stays constant however long the input is. Records already
+    counted in checkpoint.done are skipped. Returns (written, failed).
+    """
+    skip = checkpoint.done if checkpoint else 0
+    pending = deque()  # (record, request) in input order
+    written = failed = 0
+
+    def write_head():
+        nonlocal written, failed
+        record, request = pending.popleft()
+        try:
+            corrected, error = request.future.result(), None
+        except Exception as e:
+            corrected, error = None, e
+            failed += 1
+            print(f"Error correcting record {skip + written + 1}: {e}", file=sys.stderr)
+        out.write(format_result(record, input_format, corrected, error, output_field))
+        written += 1
+        if checkpoint and written % checkpoint_every == 0:
+            out.flush()
+            checkpoint.done = skip + written
+            checkpoint.output_bytes = out.tell()
+            checkpoint.save()
+        if on_progress:
+            on_progress(skip + written)
+
+    for index, record in enumerate(records):
+        if index < skip:
+            continue
+        pending.append((record, engine.submit(record.text, replace=False)))
+        # Write every finished row at the head, and block on the head once the window is full
+        while pending and (len(pending) >= window or pending[0][1].future.done()):
+            write_head()
+    while pending:
+        write_head()
+
+    out.flush()
+    if checkpoint:
+        checkpoint.done = skip + written
+        checkpoint.output_bytes = out.tell()
+        checkpoint.save()
+    return written, failed
+
+
+def load_api_key(path='api.key'):
+    """Return the API key from GOOGLE_API_KEY or the api.key file the app uses"""
+    if os.environ.get("GOOGLE_API_KEY"):
+        return os.environ["GOOGLE_API_KEY"]
+    try:
+        with open(path, 'r') as f:
+            api_key = f.read().strip()
+    except OSError:
+        api_key = ""
+    if not api_key:
+        raise RuntimeError("Set GOOGLE_API_KEY or put the key in api.key")
+    return api_key
+
+
+def add_arguments(parser):
+    """Add the batch options to an argparse parser"""
+    parser.add_argument('inputs', nargs='*', default=['-'], help='files to correct ("-" for stdin, the default)')
+    parser.add_argument('-o', '--output', help='output file (default stdout; required for --resume)')
+    parser.add_argument('--format', choices=FORMATS, help='input format (default: jsonl for .jsonl files, else paragraphs)')
+    parser.add_argument('--field', default='text', help='JSONL field holding the text to correct')
+    parser.add_argument('--output-field', default='corrected', help='JSONL field the correction is written to')
+    parser.add_argument('--concurrency', type=int, default=4, help='corrections in flight at once')
+    parser.add_argument('--resume', action='store_true', help='continue from the checkpoint next to --output')
+    parser.add_argument('--checkpoint-every', type=int, default=100, help='rows between checkpoints')
+    parser.add_argument('--no-cache', action='store_true', help='do not read or fill the correction cache')
+    parser.add_argument('--no-history', action='store_true',
+                        help='do not search or extend the history of past corrections')
+    parser.add_argument('--batch-window', type=float, default=0, metavar='MS',
+                        help='send short texts arriving within MS milliseconds as one request (0 = off)')
+    parser.add_argument('--batch-size', type=int, default=8, help='most texts in one batched request')
+    parser.add_argument('--deadline', type=float, default=30, metavar='SECONDS',
+                        help='give up on a model call, retries included, after SECONDS')
+    parser.add_argument('--hedge', action='store_true',
+                        help='send a second request when a call is slower than the recent p95')
+    parser.add_argument('--models', metavar='NAMES',
+                        help='route between these comma-separated models, fastest first (default: one model)')
+    parser.add_argument('--policy', choices=POLICIES, default='fastest',
+                        help='with --models: fastest model, or the best one for longer texts')
+    parser.add_argument('--daemon', nargs='?', const='', metavar='URL',
+                        help='send corrections to a running correction daemon (default address if no URL)')
+
+
+def run(args, get_model=None):
+    """Run a batch job from parsed arguments; returns a process exit code"""
+    input_format = args.format or detect_format(args.inputs)
+    if args.resume and not args.output:
+        print("--resume needs --output", file=sys.stderr)
+        return 2
+
+    remote = None
+    if args.daemon is not None:
+        from correction_daemon import DaemonClient
+        remote = DaemonClient(args.daemon or None)
+
+    cache = None
+    if not args.no_cache and remote is None:
+        from correction_cache import CorrectionCache
+        cache = CorrectionCache()
+    history = None
+    if not args.no_history and remote is None:
+        from correction_history import CorrectionHistory
+        history = CorrectionHistory()
+
+    router = None
+    if get_model is None:
+        model = []
+
+        def get_model():
+            if not model:
+                model.append(create_model(load_api_key()))
+            return model[0]
+
+        if args.models:
+            router = ModelRouter(lambda name: create_model(load_api_key(), name), parse_models(args.models),
+                                 args.policy)
+
+    engine = CorrectionEngine(get_model, max_workers=args.concurrency, cache=cache,
+                              max_chunks_in_flight=args.concurrency, remote=remote,
+                              batch_window=args.batch_window / 1000, batch_size=args.batch_size,
+                              deadline=args.deadline, hedge=args.hedge, router=router, history=history)
+    checkpoint = None
+    out = sys.stdout
+    try:
+        if args.output:
+            checkpoint = Checkpoint(args.output + ".checkpoint", args.inputs, input_format)
+            if args.resume and checkpoint.load():
+                out = open(args.output, 'r+', encoding='utf-8', newline='')
+                out.seek(checkpoint.output_bytes)
+                out.truncate()  # Drop rows written after the last checkpoint
+                print(f"Resuming after {checkpoint.done} rows", file=sys.stderr)
+            else:
+                out = open(args.output, 'w', encoding='utf-8', newline='')
+        records = read_records(args.inputs, input_format, args.field)
+        written, failed = run_batch(engine, records, out, input_format, window=args.concurrency * 4,
+                                    checkpoint=checkpoint, checkpoint_every=args.checkpoint_every,
+                                    output_field=args.output_field)
+    finally:
+        engine.shutdown()
+        if out is not sys.stdout:
+            out.close()
+        if cache is not None:
+            cache.close()
+        if history is not None:
+            history.close()
+
+    if checkpoint:
+        checkpoint.remove()  # The job reached the end; failed rows are marked in the output
+    print(f"Corrected {written - failed} records, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
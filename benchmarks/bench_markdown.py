@@ -0,0 +1,77 @@
+"""Compare markdown_to_plain_text with the original ten-pass implementation
+
+Run from the repository root:
+
+    python benchmarks/bench_markdown.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from markdown_text import MarkdownConverter, markdown_to_plain_text
+
+
+def legacy_markdown_to_plain_text(markdown_text):
+    """The original implementation, kept as the reference"""
+    text = re.sub(r'#+\s+(.*)', r'\1', markdown_text)
+    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
+    text = re.sub(r'\*(.*?)\*', r'\1', text)
+    text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)
+    text = re.sub(r'`(.*?)`', r'\1', text)
+    text = re.sub(r'^\s*[-*+]\s+(.*?)$', r'\1', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*\d+\.\s+(.*?)$', r'\1', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*[-_*]{3,}\s*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+SMALL = """## Tip: Use "Could you..." for polite requests
+
+**Penjelasan:** Gunakan *could you* agar permintaan terdengar lebih sopan.
+
+* **Contoh:** Could you send me the report by Friday?
+* Hindari: `Send me the report.`
+"""
+
+LARGE = (SMALL + """
+1. Open with context.
+2. State the request clearly.
+3. Close with thanks, see [the guide](https://example.com/guide).
+
+---
+
+```
+Dear team,
+Could you review the draft?
+```
+""") * 40
+
+
+def stream(text, chunk_size=64):
+    """Convert text fed in small chunks, as streamed model output would be"""
+    converter = MarkdownConverter()
+    parts = [converter.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size)]
+    parts.append(converter.close())
+    return "".join(parts)
+
+
+def main():
+    for name, text in (("small", SMALL), ("large", LARGE)):
+        expected = legacy_markdown_to_plain_text(text)
+        assert markdown_to_plain_text(text) == expected, name
+        assert stream(text) == expected, name
+
+        number = 2000 if name == "small" else 50
+        for label, func in (("legacy", legacy_markdown_to_plain_text),
+                            ("compiled", markdown_to_plain_text),
+                            ("streamed", stream)):
+            seconds = min(timeit.repeat(lambda: func(text), number=number, repeat=5)) / number
+            print(f"{name:5} ({len(text):6} chars) {label:8} {seconds * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
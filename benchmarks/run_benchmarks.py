@@ -0,0 +1,263 @@
+"""Headless benchmarks for the non-UI hot paths, written as JSON
+
+Nothing here needs a display, hotkeys or an API key: the model is a stub
+with a configurable latency and typed text goes to a recording sink.
+Run from the repository root:
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --latency 0.2 --quick
+
+Compare two result files to spot regressions between versions.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))  # bench_markdown
+
+from chunking import chunk_text
+from correction_cache import CorrectionCache, make_cache_key
+from correction_history import CorrectionHistory
+from correction_engine import (CORRECTION_INSTRUCTION, MODEL_NAME, CorrectionEngine, StreamingCleaner,
+                               build_correction_prompt, clean_correction)
+from markdown_text import markdown_to_plain_text
+from metrics import Metrics
+from model_router import MODELS, ModelRouter
+from output_sinks import NullSink, RecordingSink, SinkRouter, measure_throughput
+from bench_markdown import LARGE as MARKDOWN_LARGE, SMALL as MARKDOWN_SMALL
+from stub_model import StubModel
+
+SHORT_TEXT = "i want ask you if we can moved the meeting to tomorow because i have other appointment"
+LONG_TEXT = " ".join([SHORT_TEXT + "."] * 60)
+
+
+def time_per_call(func, number, repeat=5):
+    """Run func number times per round and return per-call statistics in microseconds"""
+    rounds = [seconds / number * 1e6 for seconds in timeit.repeat(func, number=number, repeat=repeat)]
+    return {
+        'calls': number * repeat,
+        'min_us': round(min(rounds), 3),
+        'median_us': round(statistics.median(rounds), 3),
+    }
+
+
+def bench(results, name, func, number, **extra):
+    row = {'name': name, **time_per_call(func, max(1, int(number))), **extra}
+    results.append(row)
+    print(f"{name:40} {row['median_us']:12.2f} us", file=sys.stderr)
+
+
+def bench_prompts(results, scale):
+    response = ' "' + SHORT_TEXT + '"\n'
+    bench(results, 'prompt.build', lambda: build_correction_prompt(SHORT_TEXT), 20000 * scale)
+    bench(results, 'prompt.clean', lambda: clean_correction(response), 20000 * scale)
+
+    def clean_streamed():
+        cleaner = StreamingCleaner()
+        for start in range(0, len(LONG_TEXT), 16):
+            cleaner.feed(LONG_TEXT[start:start + 16])
+        cleaner.flush()
+    bench(results, 'prompt.clean_streamed_long', clean_streamed, 20 * scale, chars=len(LONG_TEXT))
+    bench(results, 'chunking.chunk_text_long', lambda: chunk_text(LONG_TEXT), 200 * scale, chars=len(LONG_TEXT))
+
+
+def bench_markdown(results, scale):
+    bench(results, 'markdown.small', lambda: markdown_to_plain_text(MARKDOWN_SMALL), 2000 * scale,
+          chars=len(MARKDOWN_SMALL))
+    bench(results, 'markdown.large', lambda: markdown_to_plain_text(MARKDOWN_LARGE), 20 * scale,
+          chars=len(MARKDOWN_LARGE))
+
+
+def bench_cache(results, scale, directory):
+    bench(results, 'cache.make_key', lambda: make_cache_key(SHORT_TEXT, CORRECTION_INSTRUCTION, MODEL_NAME),
+          20000 * scale)
+
+    cache = CorrectionCache(path=os.path.join(directory, 'bench.sqlite3'))
+    keys = [make_cache_key(f"{SHORT_TEXT} {i}", CORRECTION_INSTRUCTION, MODEL_NAME) for i in range(500)]
+    puts = itertools.count()
+    bench(results, 'cache.put', lambda: cache.put(keys[next(puts) % len(keys)], SHORT_TEXT), 100 * scale)
+    bench(results, 'cache.get_memory_hit', lambda: cache.get(keys[-1]), 20000 * scale)
+
+    # Clearing the memory tier before each lookup forces a read from SQLite
+    def disk_hit():
+        cache.memory.clear()
+        cache.get(keys[0])
+    bench(results, 'cache.get_disk_hit', disk_hit, 2000 * scale)
+    bench(results, 'cache.get_miss', lambda: cache.get('missing'), 2000 * scale)
+    cache.close()
+
+
+def bench_history(results, scale, directory):
+    """Near-duplicate lookups as the history grows, with its size on disk and hit rate"""
+    rng = random.Random(7)
+    words = SHORT_TEXT.split() + LONG_TEXT.split()[:40] + "report client budget review friday call team".split()
+
+    def sentence():
+        return " ".join(rng.choice(words) for _ in range(rng.randint(8, 18)))
+
+    history = CorrectionHistory(path=os.path.join(directory, 'history.sqlite3'))
+    sentences = []
+    for size in (1000, 10000, 100000):
+        size = max(100, int(size * scale))
+        while len(sentences) < size:
+            sentences.append(sentence())
+            history.add(sentences[-1], sentences[-1], commit=False)
+        history.commit()
+
+        def near_duplicate():
+            words_in = rng.choice(sentences).split()
+            words_in[rng.randrange(len(words_in))] = rng.choice(words)
+            history.lookup(" ".join(words_in))
+        bench(results, f'history.lookup_near_duplicate_{size}', near_duplicate, 200 * scale)
+        bench(results, f'history.lookup_unrelated_{size}', lambda: history.lookup(sentence()), 200 * scale)
+        stats = history.stats()
+        results[-1].update(entries=stats['entries'], size_bytes=stats['size_bytes'], hit_rate=round(stats['hit_rate'], 3))
+    bench(results, 'history.add', lambda: history.add(sentence(), SHORT_TEXT), 200 * scale)
+    history.close()
+
+
+def bench_sinks(results, scale):
+    recording = RecordingSink()
+    null = NullSink()
+    router = SinkRouter([recording], mode='recording')
+    for name, sink in (('recording', recording), ('null', null), ('router', router)):
+        bench(results, f'sink.{name}_write', lambda sink=sink: sink.write(SHORT_TEXT), 20000 * scale,
+              chars_per_second=round(measure_throughput(sink, SHORT_TEXT, int(1000 * scale) or 1)))
+
+
+def run_engine(engine, text, streaming, sink):
+    """Submit one correction and return (time to first char, total) once it was written to sink"""
+    done = threading.Event()
+    start = time.perf_counter()
+    first = []
+
+    def on_chunk(request, piece):
+        if not first:
+            first.append(time.perf_counter())
+        sink.write(piece)
+
+    def on_done(request, corrected):
+        if not streaming:
+            first.append(time.perf_counter())
+            sink.write(corrected)
+        done.set()
+
+    engine.submit(text, on_done=on_done, on_error=lambda request, error: done.set(),
+                  on_chunk=on_chunk if streaming else None)
+    done.wait(30)
+    end = time.perf_counter()
+    return (first[0] if first else end) - start, end - start
+
+
+def bench_engine(results, latency, rounds, directory):
+    """End-to-end submit-to-typed timings through the engine with the stub model"""
+    model = StubModel(latency=latency)
+    sink = RecordingSink()
+    cache = CorrectionCache(path=os.path.join(directory, 'engine.sqlite3'))
+    cases = (
+        ('engine.blocking_short', None, SHORT_TEXT, False),
+        ('engine.streaming_short', None, SHORT_TEXT, True),
+        ('engine.blocking_long_chunked', None, LONG_TEXT, False),
+        ('engine.cache_hit_short', cache, SHORT_TEXT, False),
+    )
+    for name, case_cache, text, streaming in cases:
+        engine = CorrectionEngine(lambda: model, cache=case_cache, metrics=Metrics())
+        if case_cache is not None:
+            run_engine(engine, text, streaming, sink)  # Fill the cache
+        timings = [run_engine(engine, text, streaming, sink) for _ in range(rounds)]
+        engine.shutdown()
+        firsts = sorted(first for first, _ in timings)
+        totals = sorted(total for _, total in timings)
+        row = {
+            'name': name,
+            'calls': rounds,
+            'model_latency_ms': latency * 1000,
+            'first_char_median_ms': round(statistics.median(firsts) * 1000, 3),
+            'total_median_ms': round(statistics.median(totals) * 1000, 3),
+            'total_max_ms': round(totals[-1] * 1000, 3),
+            'chars': len(text),
+        }
+        results.append(row)
+        print(f"{name:40} {row['total_median_ms']:12.2f} ms", file=sys.stderr)
+    cache.close()
+
+
+def check_routing(results, latency):
+    """Fail unless a request goes to another model while the fastest one's circuit is open"""
+    models = {name: StubModel(latency=latency) for name, _, _ in MODELS}
+    router = ModelRouter(models.get)
+    engine = CorrectionEngine(lambda: None, router=router, metrics=Metrics())
+    fastest = MODELS[0][0]
+    breaker = engine.caller.breaker(fastest)
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    _, total = run_engine(engine, SHORT_TEXT, False, NullSink())
+    engine.shutdown()
+    used = [name for name, model in models.items() if model.calls]
+    if models[fastest].calls or not used:
+        raise RuntimeError(f"with {fastest}'s circuit open the request went to {used or 'no model'}")
+    results.append({'name': 'engine.route_around_open_circuit', 'routed_to': used[0],
+                    'total_ms': round(total * 1000, 3)})
+    print(f"{'engine.route_around_open_circuit':40} {used[0]}", file=sys.stderr)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--latency', type=float, default=0.05, help='stub model latency in seconds')
+    parser.add_argument('--rounds', type=int, default=20, help='submissions per engine benchmark')
+    parser.add_argument('--quick', action='store_true', help='fewer iterations, for a smoke run')
+    args = parser.parse_args()
+
+    scale = 0.1 if args.quick else 1
+    results = []
+    directory = tempfile.mkdtemp(prefix='fix-my-english-bench-')
+    try:
+        bench_prompts(results, scale)
+        bench_markdown(results, scale)
+        bench_cache(results, scale, directory)
+        bench_history(results, scale, directory)
+        bench_sinks(results, scale)
+        bench_engine(results, args.latency, max(1, int(args.rounds * scale)), directory)
+        check_routing(results, args.latency)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        'revision': git_revision(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
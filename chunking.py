@@ -0,0 +1,48 @@
+import re
+
+# Rough characters-per-token ratio for English text
+CHARS_PER_TOKEN = 4
+
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def estimate_tokens(text):
+    """Cheap token estimate used for chunk budgets"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_sentences(text):
+    """Split a paragraph into sentences"""
+    return [sentence for sentence in SENTENCE_END.split(text.strip()) if sentence]
+
+
+def chunk_text(text, max_tokens=200):
+    """Split text into paragraphs or sentence groups that fit the token budget
+
+    Paragraphs that fit are kept whole. Longer paragraphs are split into
+    consecutive sentence groups; a single sentence over budget becomes a
+    chunk of its own.
+    """
+    chunks = []
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            chunks.append(paragraph)
+            continue
+
+        group = []
+        group_tokens = 0
+        for sentence in split_sentences(paragraph):
+            tokens = estimate_tokens(sentence) + 1
+            if group and group_tokens + tokens > max_tokens:
+                chunks.append(" ".join(group))
+                group = []
+                group_tokens = 0
+            group.append(sentence)
+            group_tokens += tokens
+        if group:
+            chunks.append(" ".join(group))
+    return chunks
@@ -0,0 +1,151 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from app_paths import data_path
+
+
+def normalize_input(text):
+    """Normalize input so trivially different submissions share a cache entry"""
+    return " ".join(text.split())
+
+
+def make_cache_key(text, prompt_template, model_name):
+    """Build a cache key from the normalized input, prompt template and model name"""
+    digest = hashlib.sha256()
+    for part in (model_name, prompt_template, normalize_input(text)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class CorrectionCache:
+    """Two-tier correction cache: an in-memory LRU in front of an SQLite store"""
+
+    def __init__(self, path=None, memory_size=256, disk_size=10000, ttl=30 * 24 * 3600):
+        self.path = path or data_path("corrections.sqlite3")
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.ttl = ttl
+        self.memory = OrderedDict()  # key -> (value, created)
+        self.lock = threading.Lock()
+
+        # Access times of disk hits, written by the next put() instead of on the caller's
+        # thread; one per stored row at most, so bounded by disk_size
+        self.touched = {}  # key -> accessed
+
+        # Hit/miss counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS corrections ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS corrections_accessed ON corrections (accessed)")
+        self.purge_expired()
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                if now - entry[1] <= self.ttl:
+                    self.memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[0]
+                del self.memory[key]
+
+            # Lookups never write: expired rows are left to purge_expired() and put()
+            row = self.db.execute("SELECT value, created FROM corrections WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+
+            # Promote the disk entry into memory
+            self.touched[key] = now
+            self._remember(key, row[0], row[1])
+            self.disk_hits += 1
+            return row[0]
+
+    def put(self, key, value):
+        """Store a value in both tiers"""
+        now = time.time()
+        with self.lock:
+            self._remember(key, value, now)
+            self._write_touched()
+            self.db.execute(
+                "INSERT OR REPLACE INTO corrections (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            # Drop the least recently used rows once the store is over its size
+            cursor = self.db.execute(
+                "DELETE FROM corrections WHERE key IN ("
+                "SELECT key FROM corrections ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.disk_size,)
+            )
+            self.evictions += max(cursor.rowcount, 0)
+            self.db.commit()
+
+    def values(self):
+        """Return every stored correction (bounded by disk_size)"""
+        with self.lock:
+            return [row[0] for row in self.db.execute("SELECT value FROM corrections")]
+
+    def purge_expired(self):
+        """Remove entries older than the TTL from disk"""
+        with self.lock:
+            self._write_touched()
+            cursor = self.db.execute("DELETE FROM corrections WHERE created < ?", (time.time() - self.ttl,))
+            self.evictions += max(cursor.rowcount, 0)
+            self.db.commit()
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self.lock:
+            self.memory.clear()
+            self.touched.clear()
+            self.db.execute("DELETE FROM corrections")
+            self.db.commit()
+
+    def stats(self):
+        """Return hit/miss counters and tier sizes"""
+        with self.lock:
+            disk_entries = self.db.execute("SELECT COUNT(*) FROM corrections").fetchone()[0]
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'memory_entries': len(self.memory),
+                'disk_entries': disk_entries,
+            }
+
+    def close(self):
+        """Write pending access times and close the on-disk store"""
+        with self.lock:
+            self._write_touched()
+            self.db.commit()
+            self.db.close()
+
+    def _write_touched(self):
+        """Queue the access times of recent disk hits; the caller commits"""
+        if self.touched:
+            self.db.executemany("UPDATE corrections SET accessed = ? WHERE key = ?",
+                                [(accessed, key) for key, accessed in self.touched.items()])
+            self.touched.clear()
+
+    def _remember(self, key, value, created):
+        """Insert into the in-memory LRU, evicting the oldest entry when full"""
+        self.memory[key] = (value, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
@@ -0,0 +1,305 @@
+import http.client
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from memory_monitor import MemoryMonitor, current_rss
+from model_router import POLICIES, ModelRouter, parse_models
+
+# Loopback address the daemon listens on by default
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+
+# Largest request body accepted, in bytes
+MAX_BODY = 1_000_000
+
+
+class DaemonError(RuntimeError):
+    """The daemon could not be reached or returned an error"""
+
+
+class CorrectionDaemon:
+    """Serves one warm CorrectionEngine (model and cache) to local clients over HTTP
+
+    POST /correct  {"text": ...}  ->  {"corrected": ..., "cache_hit": ..., "ms": ...}
+    GET  /stats                   ->  queue depth, throughput, engine metrics, cache stats
+    GET  /memory                  ->  RSS, buffer sizes, tracemalloc allocators and diffs
+    GET  /health                  ->  {"ok": true}
+    """
+
+    def __init__(self, engine, host=DEFAULT_HOST, port=DEFAULT_PORT, request_timeout=120,
+                 throughput_window=60):
+        self.engine = engine
+        self.request_timeout = request_timeout
+        self.throughput_window = throughput_window
+        self.started = time.time()
+        self.completed = deque(maxlen=10000)  # Completion times inside the throughput window
+        self.lock = threading.Lock()
+        self.served = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.memory = MemoryMonitor()
+        self.server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.server.daemon_threads = True
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def start(self):
+        """Serve from a background thread and return it"""
+        thread = threading.Thread(target=self.serve_forever, name="correction-daemon", daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def correct(self, text):
+        """Correct text through the shared engine (handler threads)"""
+        with self.lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            request = self.engine.submit(text, replace=False)
+            corrected = request.future.result(self.request_timeout)
+        except Exception:
+            with self.lock:
+                self.failed += 1
+            raise
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+        with self.lock:
+            self.served += 1
+            self.completed.append(time.time())
+        return {
+            'corrected': corrected,
+            'cache_hit': request.cache_hit,
+            'ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+
+    def stats(self):
+        """Queue depth, throughput and the engine's counters"""
+        now = time.time()
+        with self.lock:
+            while self.completed and now - self.completed[0] > self.throughput_window:
+                self.completed.popleft()
+            recent = len(self.completed)
+            stats = {
+                'uptime': round(now - self.started, 1),
+                'in_flight': self.in_flight,
+                'served': self.served,
+                'failed': self.failed,
+            }
+        with self.engine.lock:
+            stats['queue_depth'] = len(self.engine.pending)
+        stats['throughput_per_second'] = round(recent / min(self.throughput_window, max(now - self.started, 1e-3)), 3)
+        stats['rss_bytes'] = current_rss()
+        stats['metrics'] = self.engine.metrics.snapshot()
+        stats['timing'] = self.engine.timing_summary()
+        if self.engine.cache is not None:
+            stats['cache'] = self.engine.cache.stats()
+        if self.engine.batcher is not None:
+            stats['batching'] = self.engine.batcher.stats()
+        stats['resilience'] = self.engine.caller.stats()
+        if self.engine.history is not None:
+            stats['history'] = self.engine.history.stats()
+        if self.engine.router is not None:
+            stats['routing'] = self.engine.router.stats()
+        return stats
+
+    def memory_stats(self):
+        """RSS, buffer sizes against their limits and tracemalloc allocators"""
+        buffers = self.engine.buffers()
+        with self.lock:
+            buffers['daemon completions'] = (len(self.completed), self.completed.maxlen)
+        return self.memory.stats(buffers=buffers)
+
+
+def _make_handler(daemon):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep connections open for the clients' reuse
+
+        def do_GET(self):
+            if self.path == '/health':
+                self.send_json(200, {'ok': True})
+            elif self.path == '/stats':
+                self.send_json(200, daemon.stats())
+            elif self.path == '/memory':
+                self.send_json(200, daemon.memory_stats())
+            else:
+                self.send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/correct':
+                self.send_json(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                if length > MAX_BODY:
+                    self.send_json(413, {'error': 'request too large'})
+                    return
+                text = json.loads(self.rfile.read(length)).get('text')
+            except (ValueError, AttributeError):
+                self.send_json(400, {'error': 'expected a JSON object with a "text" field'})
+                return
+            if not isinstance(text, str):
+                self.send_json(400, {'error': 'expected a JSON object with a "text" field'})
+                return
+            try:
+                self.send_json(200, daemon.correct(text))
+            except Exception as e:
+                self.send_json(502, {'error': str(e) or type(e).__name__})
+
+        def send_json(self, status, data):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Requests are counted in /stats instead of logged
+
+    return Handler
+
+
+class DaemonClient:
+    """Thin client for a running CorrectionDaemon
+
+    Each calling thread keeps its own persistent connection, so repeated
+    corrections reuse the socket instead of reconnecting.
+    """
+
+    def __init__(self, url=None, timeout=120):
+        parts = urlsplit(url or DEFAULT_URL)
+        self.host = parts.hostname or DEFAULT_HOST
+        self.port = parts.port or DEFAULT_PORT
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def correct(self, text):
+        """Return the corrected text"""
+        return self.request('POST', '/correct', {'text': text})['corrected']
+
+    def stats(self):
+        return self.request('GET', '/stats')
+
+    def memory(self):
+        return self.request('GET', '/memory')
+
+    def available(self):
+        """True when the daemon answers its health check"""
+        try:
+            return self.request('GET', '/health').get('ok', False)
+        except DaemonError:
+            return False
+
+    def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        # A kept-alive connection the server has since closed gets one retry on a fresh one
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                self.local.connection = None
+                if attempt or isinstance(e, TimeoutError):
+                    raise DaemonError(f"correction daemon unavailable: {e}") from e
+        try:
+            result = json.loads(data)
+        except ValueError as e:
+            raise DaemonError(f"bad response from correction daemon: {e}") from e
+        if response.status != 200:
+            raise DaemonError(result.get('error', f"HTTP {response.status}"))
+        return result
+
+    def _connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.local.connection = connection
+        return connection
+
+
+def add_arguments(parser):
+    """Add the daemon options to an argparse parser"""
+    parser.add_argument('--host', default=DEFAULT_HOST, help='address to listen on (default loopback only)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on')
+    parser.add_argument('--workers', type=int, default=4, help='corrections run at once')
+    parser.add_argument('--stub', type=float, metavar='LATENCY',
+                        help='answer with an offline stub model after LATENCY seconds instead of Gemini')
+    parser.add_argument('--no-cache', action='store_true', help='do not read or fill the correction cache')
+    parser.add_argument('--no-history', action='store_true',
+                        help='do not search or extend the history of past corrections')
+    parser.add_argument('--batch-window', type=float, default=0, metavar='MS',
+                        help='send short texts arriving within MS milliseconds as one request (0 = off)')
+    parser.add_argument('--batch-size', type=int, default=8, help='most texts in one batched request')
+    parser.add_argument('--deadline', type=float, default=30, metavar='SECONDS',
+                        help='give up on a model call, retries included, after SECONDS')
+    parser.add_argument('--hedge', action='store_true',
+                        help='send a second request when a call is slower than the recent p95')
+    parser.add_argument('--models', metavar='NAMES',
+                        help='route between these comma-separated models, fastest first (default: one model)')
+    parser.add_argument('--policy', choices=POLICIES, default='fastest',
+                        help='with --models: fastest model, or the best one for longer texts')
+
+
+def run(args):
+    """Run the daemon in the foreground until interrupted; returns a process exit code"""
+    from correction_engine import CorrectionEngine, create_model
+    from batch_correct import load_api_key
+
+    if args.stub is not None:
+        from stub_model import StubModel
+        model = StubModel(latency=args.stub)
+    else:
+        model = create_model(load_api_key())  # Created up front so the first request is warm
+
+    router = None
+    if args.models:
+        router = ModelRouter(lambda name: model if args.stub is not None else create_model(load_api_key(), name),
+                             parse_models(args.models), args.policy)
+
+    cache = None
+    if not args.no_cache:
+        from correction_cache import CorrectionCache
+        cache = CorrectionCache()
+    history = None
+    if not args.no_history:
+        from correction_history import CorrectionHistory
+        history = CorrectionHistory()
+    engine = CorrectionEngine(lambda: model, max_workers=args.workers, cache=cache,
+                              max_chunks_in_flight=args.workers,
+                              batch_window=args.batch_window / 1000, batch_size=args.batch_size,
+                              deadline=args.deadline, hedge=args.hedge, router=router, history=history)
+    daemon = CorrectionDaemon(engine, args.host, args.port)
+    print(f"Correction daemon listening on {daemon.address}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.shutdown()
+        engine.shutdown()
+        if cache is not None:
+            cache.close()
+        if history is not None:
+            history.close()
+    return 0
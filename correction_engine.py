@@ -0,0 +1,662 @@
+import itertools
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, CancelledError
+
+from chunking import chunk_text, estimate_tokens
+from correction_cache import make_cache_key, normalize_input
+from metrics import Metrics, CorrectionTrace
+from micro_batcher import MicroBatcher
+from resilience import CircuitOpenError, ResilientCaller
+
+# Model used for corrections and tips
+MODEL_NAME = 'gemini-2.0-flash-lite'
+
+# Instructions the correction model is configured with once; each request then carries only
+# the text. Context caching only takes contents of thousands of tokens, far more than these.
+CORRECTION_INSTRUCTION = "Improve the text you are given to make it more suitable for casual business English. Correct any grammar or spelling errors, and make it sound natural but still professional. Respond ONLY with the improved version, without explanations or additional content."
+INSTRUCTION_BYTES = len(CORRECTION_INSTRUCTION.encode('utf-8'))
+
+
+def create_model(api_key=None, model_name=MODEL_NAME, system_instruction=CORRECTION_INSTRUCTION):
+    """Create a Gemini model with its system instruction, importing google.generativeai on first use"""
+    import google.generativeai as genai
+    genai.configure(api_key=api_key or os.environ["GOOGLE_API_KEY"])
+    return genai.GenerativeModel(model_name, system_instruction=system_instruction)
+
+
+# Prompt for a text sent along with the past correction of a similar one as a worked example
+CORRECTION_EXAMPLE = "A similar text was improved like this before.\nOriginal: {original}\nImproved: {corrected}\n\nThe text is: {text}"
+
+
+def build_correction_prompt(text, example=None):
+    """Build the per-request prompt: the text alone, or after an (original, corrected) example"""
+    if example is None:
+        return text
+    return CORRECTION_EXAMPLE.format(original=example[0], corrected=example[1], text=text)
+
+
+def clean_correction(text):
+    """Post-process the model output before it is typed"""
+    return text.strip().replace('"', '').replace('\n', ' ')
+
+
+# Micro-batches that may be waiting on the model at once
+BATCHES_IN_FLIGHT = 2
+
+
+# Errors that mean the model could not be reached, as opposed to a rejected request
+NETWORK_ERRORS = ('ServiceUnavailable', 'DeadlineExceeded', 'RetryError', 'TransportError', 'DaemonError',
+                  'CircuitOpenError')
+
+
+def is_network_error(error):
+    """True when error comes from a connection or timeout problem"""
+    return isinstance(error, OSError) or type(error).__name__ in NETWORK_ERRORS
+
+
+# Where a streamed chunk may be cut: after any whitespace, or after a sentence end
+STREAM_BOUNDARIES = {
+    'word': re.compile(r'\s'),
+    'sentence': re.compile(r'[.!?]\s'),
+}
+
+
+class StreamingCleaner:
+    """Apply clean_correction incrementally to streamed model output
+
+    Text is only released up to the last word (or sentence) boundary so the
+    typed output never has to be taken back. Concatenating everything
+    returned by feed() and flush() gives the same result as clean_correction
+    on the full response.
+    """
+
+    def __init__(self, boundary='word'):
+        self.boundary = STREAM_BOUNDARIES[boundary]
+        self.started = False
+        self.trailing = ""  # Raw whitespace that strip() may still remove
+        self.buffer = ""  # Cleaned text not yet released
+
+    def feed(self, chunk):
+        """Add a raw chunk and return the cleaned text that is ready to emit"""
+        raw = self.trailing + chunk
+        if not self.started:
+            raw = raw.lstrip()
+            if not raw:
+                return ""
+            self.started = True
+        body = raw.rstrip()
+        self.trailing = raw[len(body):]
+        self.buffer += body.replace('"', '').replace('\n', ' ')
+        
+        # Release everything up to the last boundary
+        cut = 0
+        for match in self.boundary.finditer(self.buffer):
+            cut = match.end()
+        ready, self.buffer = self.buffer[:cut], self.buffer[cut:]
+        return ready
+
+    def flush(self):
+        """Return whatever is left once the stream has ended"""
+        ready, self.buffer, self.trailing = self.buffer, "", ""
+        return ready
+
+
+class CorrectionRequest:
+    """A single correction submitted to the engine"""
+
+    def __init__(self, request_id, text, streaming=False, trace=None):
+        self.id = request_id
+        self.text = text
+        self.streaming = streaming
+        self.trace = trace or CorrectionTrace()
+        self.future = None
+        self.cancel_event = threading.Event()
+        self.cache_key = None
+        self.cache_hit = False
+        self.source = 'model'  # Or 'cache', 'history', 'local' (fast path) or 'offline' (model unreachable)
+        self.example = None  # (original, corrected) of a similar past text, sent along with the prompt
+        
+        # perf_counter timestamps used to compare streaming and blocking runs
+        self.submitted_at = time.perf_counter()
+        self.first_char_at = None
+        self.finished_at = None
+        self.trace.mark('submit', self.submitted_at)
+        self.trace.info.update(mode='streaming' if streaming else 'blocking', chars_in=len(text))
+
+    @property
+    def time_to_first_char(self):
+        if self.first_char_at is None:
+            return None
+        return self.first_char_at - self.submitted_at
+
+    @property
+    def total_time(self):
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.submitted_at
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """Cancel the request; a running model call is left to finish but its result is dropped"""
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class CorrectionEngine:
+    """Runs model corrections on a bounded worker pool so the Tk loop never blocks"""
+
+    def __init__(self, get_model, dispatch=None, max_workers=2, stream_boundary='word',
+                 cache=None, model_name=MODEL_NAME, chunk_tokens=200, chunk_threshold=300,
+                 max_chunks_in_flight=4, metrics=None, remote=None, batch_window=None, batch_size=8,
+                 local=None, local_first=False, deadline=30.0, hedge=False, router=None, on_pending=None,
+                 history=None):
+        # get_model returns the model to use; dispatch(fn, *args) runs fn on the UI thread.
+        # on_pending(count) is dispatched whenever the number of queued or running requests changes.
+        # With remote (an object with correct(text), e.g. a DaemonClient) corrections are
+        # delegated to it instead of calling the model here.
+        self.get_model = get_model
+        self.remote = remote
+        
+        # Optional ModelRouter choosing a model per request; without one get_model() is used
+        self.router = router
+        
+        # Offline LocalCorrector: answers confident cases first when local_first is set,
+        # and stands in for the model whenever the network is unreachable
+        self.local = local
+        self.local_first = local_first
+        
+        # CorrectionHistory of past corrections: texts differing only in case or punctuation
+        # reuse their correction, similar ones send it along as an example
+        self.history = history
+        self.metrics = metrics or Metrics()
+        if router is not None and router.metrics is None:
+            router.metrics = self.metrics
+        
+        # Model calls get a deadline, retries on transient errors, a circuit breaker and,
+        # when hedge is set, a second request once the first is slower than the recent p95.
+        # Its pool fits every call that can run at once: request, chunk and batch workers,
+        # doubled for their hedges (hedging can be switched on at any time)
+        self.caller = ResilientCaller(self.metrics, deadline=deadline, hedge=hedge,
+                                      max_workers=2 * (max_workers + max_chunks_in_flight + BATCHES_IN_FLIGHT))
+        if router is not None and router.available is None:
+            router.available = self.caller.available  # Route around models whose circuit is open
+        self.stream_boundary = stream_boundary
+        self.cache = cache
+        self.model_name = model_name
+        self.dispatch = dispatch or (lambda fn, *args: fn(*args))
+        self.on_pending = on_pending
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="correction")
+        
+        # Inputs over chunk_threshold tokens are split and corrected in parallel on
+        # a separate pool, so request workers never wait on their own queue
+        self.chunk_tokens = chunk_tokens
+        self.chunk_threshold = chunk_threshold
+        self.chunk_executor = ThreadPoolExecutor(max_workers=max_chunks_in_flight, thread_name_prefix="chunk")
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.latest = None
+        self._ids = itertools.count(1)
+        self.in_flight = {}  # Normalized text -> Future shared by identical concurrent corrections
+        
+        # Opt-in: short texts arriving within batch_window seconds share one model request
+        self.batcher = None
+        if batch_window:
+            self.batcher = MicroBatcher(self._send_batch, self._correct_single, clean_correction,
+                                        window=batch_window, max_items=batch_size,
+                                        max_batches_in_flight=BATCHES_IN_FLIGHT)
+        
+        # Timings of recently finished requests
+        self.timings = deque(maxlen=200)
+
+    @property
+    def cache_model(self):
+        """Model part of the cache key
+
+        With a router the model is only chosen when the request is sent, so
+        answers are kept apart per routing policy and set of models instead.
+        """
+        if self.router is None:
+            return self.model_name
+        return f"{self.router.policy}:{','.join(self.router.models)}"
+
+    def submit(self, text, on_done=None, on_error=None, replace=True, on_chunk=None, trace=None):
+        """Queue a correction and return its request
+
+        on_done(request, corrected_text) and on_error(request, exception) are
+        called through dispatch. When on_chunk is given the response is
+        streamed and on_chunk(request, text) receives cleaned pieces as soon
+        as they end on a boundary. When replace is True any stale request is
+        cancelled first. trace carries marks made before submission (hotkey,
+        window shown); the engine adds the request and response marks.
+        """
+        request = CorrectionRequest(next(self._ids), text, streaming=on_chunk is not None, trace=trace)
+        
+        # Cache hits are answered straight away without touching the network
+        if self.cache is not None:
+            request.cache_key = make_cache_key(text, CORRECTION_INSTRUCTION, self.cache_model)
+            cached = self._cache_get(request.cache_key)
+            if cached is not None:
+                return self._resolve_ready(request, cached, on_done, on_chunk, replace)
+        
+        # Only a replacing request becomes the one cancel() targets
+        with self.lock:
+            if replace:
+                if self.latest is not None:
+                    self.latest.cancel()
+                self.latest = request
+            self.pending[request.id] = request
+            request.future = self.executor.submit(self._run, request, on_chunk)
+            pending = len(self.pending)
+        if self.on_pending:
+            self.dispatch(self.on_pending, pending)
+        request.future.add_done_callback(lambda future: self._finish(request, future, on_done, on_error))
+        return request
+
+    def submit_ready(self, text, corrected_text, on_done=None, trace=None, source='speculative'):
+        """Complete a request whose correction is already known, e.g. from speculation"""
+        request = CorrectionRequest(next(self._ids), text, trace=trace)
+        return self._resolve_ready(request, corrected_text, on_done, None, True, source)
+
+    def cancel(self, request=None):
+        """Cancel one request, or the most recent one when none is given"""
+        with self.lock:
+            request = request or self.latest
+        if request is not None:
+            request.cancel()
+
+    def cancel_all(self):
+        """Cancel every queued or running request"""
+        with self.lock:
+            requests = list(self.pending.values())
+        for request in requests:
+            request.cancel()
+
+    def correct(self, text, trace=None, example=None):
+        """Run a correction synchronously on the calling thread
+
+        A text identical to one already being corrected waits for that
+        result instead of sending a second request.
+        """
+        key = normalize_input(text)
+        with self.lock:
+            shared = self.in_flight.get(key)
+            if shared is None:
+                owned = self.in_flight[key] = Future()
+        if shared is not None:
+            self.metrics.count('deduplicated')
+            return shared.result()
+        try:
+            result = self._correct_once(text, trace, example)
+        except BaseException as e:
+            owned.set_exception(e)
+            raise
+        else:
+            owned.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+
+    def _correct_once(self, text, trace=None, example=None):
+        """Correct text remotely, as part of a batch, or with its own request"""
+        if self.remote is not None:
+            return self._correct_remote(text, trace)
+        if self.batcher is not None and example is None and self.batcher.accepts(text):
+            return self.batcher.correct(text, trace)
+        return self._correct_single(text, trace, example)
+
+    def _correct_single(self, text, trace=None, example=None):
+        """Send one correction request to the model"""
+        response = self._generate(build_correction_prompt(text, example), trace, chars=len(text))
+        received = response.text
+        self._received(received, trace)
+        self.metrics.count_tokens(response, trace)
+        if trace is not None:
+            trace.mark('response_complete')
+        return clean_correction(received)
+
+    def _correct_remote(self, text, trace=None):
+        """Have the remote corrector (already cleaned output) handle text"""
+        if trace is not None:
+            trace.mark('request_sent')
+        self.metrics.count('requests')
+        self.metrics.count('bytes_sent', len(text.encode('utf-8')))
+        corrected = self.remote.correct(text)
+        self._received(corrected, trace)
+        if trace is not None:
+            trace.mark('response_complete')
+        return corrected
+
+    def _send_batch(self, prompt, traces):
+        """Send a batched prompt for the micro-batcher and return the raw response text"""
+        for trace in traces:
+            if trace is not None:
+                trace.mark('request_sent')
+        self.metrics.count('batched_requests')
+        response = self._generate(prompt)
+        text = response.text
+        self._received(text)
+        self.metrics.count_tokens(response)
+        for trace in traces:
+            if trace is not None:
+                trace.mark('first_token')
+                trace.mark('response_complete')
+        return text
+
+    def _generate(self, prompt, trace=None, chars=None, **kwargs):
+        """Send a prompt to the routed model through the resilience layer, counting every attempt
+
+        chars is the length of the text being corrected, which the router
+        uses to pick the model; it defaults to the prompt length.
+        """
+        if trace is not None:
+            trace.mark('request_sent')
+        chars = len(prompt) if chars is None else chars
+        route = self.router.choose(chars) if self.router is not None else None
+        model = self.router.client(route) if route is not None else self.get_model()
+        if trace is not None and route is not None:
+            trace.info['model'] = route
+        
+        def attempt(timeout):
+            self.metrics.count('requests')
+            # The system instruction travels with every request, it is just not part of the prompt
+            self.metrics.count('bytes_sent', len(prompt.encode('utf-8')) + INSTRUCTION_BYTES)
+            return model.generate_content(prompt, request_options={'timeout': timeout}, **kwargs)
+        
+        # A streamed answer is typed as it arrives, so only blocking calls are hedged
+        started = time.perf_counter()
+        try:
+            response = self.caller.call(attempt, trace, key=route, stream=bool(kwargs.get('stream')))
+        except CircuitOpenError:
+            raise  # Refused without calling the model
+        except Exception:
+            if route is not None:
+                self.router.record(route, chars, time.perf_counter() - started, False)
+            raise
+        if route is None:
+            return response
+        if kwargs.get('stream'):
+            return self._timed_stream(response, route, chars, started)
+        self.router.record(route, chars, time.perf_counter() - started, True)
+        return response
+
+    def _timed_stream(self, response, route, chars, started):
+        """Pass a streamed response through, feeding its total time back to the router"""
+        try:
+            for chunk in response:
+                yield chunk
+        except GeneratorExit:
+            raise  # Abandoned by a cancelled request, not the model's fault
+        except Exception:
+            self.router.record(route, chars, time.perf_counter() - started, False)
+            raise
+        self.router.record(route, chars, time.perf_counter() - started, True)
+
+    def _received(self, text, trace=None):
+        """Count response text as it arrives"""
+        if trace is not None:
+            trace.mark('first_token')
+        self.metrics.count('bytes_received', len(text.encode('utf-8')))
+
+    def _cache_get(self, key):
+        """Look a key up in the cache, counting hits and misses"""
+        cached = self.cache.get(key)
+        self.metrics.count('cache_hits' if cached is not None else 'cache_misses')
+        return cached
+
+    def correct_stream(self, request, on_chunk):
+        """Stream a correction, dispatching cleaned pieces as they become ready"""
+        cleaner = StreamingCleaner(self.stream_boundary)
+        pieces = []
+        
+        def emit(piece):
+            if not piece or request.cancelled:
+                return
+            if request.first_char_at is None:
+                request.first_char_at = time.perf_counter()
+            pieces.append(piece)
+            self.dispatch(on_chunk, request, piece)
+        
+        response = self._generate(build_correction_prompt(request.text, request.example), request.trace,
+                                  chars=len(request.text), stream=True)
+        last = None
+        for chunk in response:
+            if request.cancelled:
+                raise CancelledError()
+            self._received(chunk.text, request.trace)
+            emit(cleaner.feed(chunk.text))
+            last = chunk
+        # Streamed chunks report running totals, so only the last one is counted
+        self.metrics.count_tokens(last, request.trace)
+        request.trace.mark('response_complete')
+        emit(cleaner.flush())
+        return "".join(pieces)
+
+    def correct_chunked(self, request, chunks, on_chunk=None):
+        """Correct chunks concurrently and reassemble them in input order
+
+        Each chunk is cached on its own, so re-submitting a mostly unchanged
+        draft only sends the chunks that changed. In streaming mode every
+        chunk is emitted as soon as it and all chunks before it are done.
+        """
+        futures = [self.chunk_executor.submit(self._correct_chunk, request, chunk) for chunk in chunks]
+        results = []
+        try:
+            for future in futures:
+                corrected = future.result()
+                if request.cancelled:
+                    raise CancelledError()
+                if on_chunk is not None and corrected:
+                    if request.first_char_at is None:
+                        request.first_char_at = time.perf_counter()
+                    self.dispatch(on_chunk, request, (" " if results else "") + corrected)
+                results.append(corrected)
+        finally:
+            for future in futures:
+                future.cancel()
+        request.trace.mark('response_complete')
+        return " ".join(results)
+
+    def _correct_chunk(self, request, chunk):
+        """Correct one chunk, going through the cache first"""
+        if request.cancelled:
+            raise CancelledError()
+        key = None
+        if self.cache is not None:
+            key = make_cache_key(chunk, CORRECTION_INSTRUCTION, self.cache_model)
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        corrected = self.correct(chunk, request.trace)
+        if key is not None and corrected:
+            self.cache.put(key, corrected)
+        return corrected
+
+    def timing_summary(self):
+        """Average time-to-first-char and total time per mode"""
+        summary = {}
+        timings = list(self.timings)  # Workers append while this runs
+        for mode in ('blocking', 'streaming'):
+            rows = [t for t in timings if t['mode'] == mode]
+            if rows:
+                summary[mode] = {
+                    'count': len(rows),
+                    'time_to_first_char': sum(t['time_to_first_char'] for t in rows) / len(rows),
+                    'total_time': sum(t['total_time'] for t in rows) / len(rows),
+                }
+        return summary
+
+    def buffers(self):
+        """Size and limit (None when it only holds live requests) of each in-memory buffer"""
+        with self.lock:
+            buffers = {
+                'engine pending': (len(self.pending), None),
+                'engine in flight': (len(self.in_flight), None),
+            }
+        buffers['engine timings'] = (len(self.timings), self.timings.maxlen)
+        buffers['call latencies'] = (len(self.caller.latencies), self.caller.latencies.maxlen)
+        buffers['metric series'] = (len(self.metrics.samples) + len(self.metrics.counters),
+                                    self.metrics.max_series * 2)
+        if self.cache is not None:
+            buffers['cache memory tier'] = (len(self.cache.memory), self.cache.memory_size)
+        if self.history is not None:
+            buffers['history entries'] = (self.history.entries, self.history.max_entries)
+            buffers['history latencies'] = (len(self.history.latencies), self.history.latencies.maxlen)
+        if self.batcher is not None:
+            buffers['batch queue'] = (len(self.batcher.items), self.batcher.max_items)
+        return buffers
+
+    def _resolve_ready(self, request, corrected_text, on_done, on_chunk, replace, source='cache'):
+        """Complete a request from the cache or another ready answer"""
+        if replace:
+            self.cancel()
+        request.source = source
+        request.trace.info['source'] = source
+        if source == 'cache':
+            request.cache_hit = True
+            request.trace.info['cache_hit'] = True
+        request.first_char_at = request.finished_at = time.perf_counter()
+        request.trace.mark('response_complete', request.finished_at)
+        request.future = Future()
+        request.future.set_result(corrected_text)
+        if on_chunk and corrected_text:
+            self.dispatch(on_chunk, request, corrected_text)
+        if on_done:
+            self.dispatch(on_done, request, corrected_text)
+        return request
+
+    def _run(self, request, on_chunk=None):
+        """Worker body for a single request"""
+        if request.cancelled:
+            raise CancelledError()
+        result = self._correct_locally(request)
+        if result is None:
+            result = self._correct_from_history(request)
+        if result is None:
+            try:
+                result = self._correct_with_model(request, on_chunk)
+            except Exception as e:
+                result = self._offline_fallback(request, e)
+        if request.source != 'model':
+            request.first_char_at = time.perf_counter()
+            if on_chunk is not None and result:
+                self.dispatch(on_chunk, request, result)  # Local answers come in one piece
+        request.finished_at = time.perf_counter()
+        request.trace.info['source'] = request.source
+        # Local answers are not cached, so turning the fast path off brings model answers back
+        if self.cache is not None and result and not request.cancelled and request.source == 'model':
+            self.cache.put(request.cache_key, result)
+        if self.history is not None and result and not request.cancelled and request.source == 'model':
+            try:
+                self.history.add(request.text, result)
+            except Exception as e:
+                print(f"Error saving correction history: {e}")
+        if self.local is not None and result and not request.cancelled and request.source == 'model':
+            self.local.remember(result)
+        if request.first_char_at is not None:
+            self.timings.append({
+                'mode': 'streaming' if request.streaming else 'blocking',
+                'time_to_first_char': request.time_to_first_char,
+                'total_time': request.total_time,
+            })
+        return result
+
+    def _correct_locally(self, request):
+        """Return the local corrector's answer when it is confident enough, else None"""
+        if self.local is None or not self.local_first:
+            return None
+        local = self.local.correct(request.text)
+        self.local.record(local.confident)
+        if not local.confident:
+            return None
+        request.source = 'local'
+        self.metrics.count('local_hits')
+        return local.text
+
+    def _correct_from_history(self, request):
+        """Reuse the correction of an equivalent past text, or attach a similar one as an example"""
+        if self.history is None or self.remote is not None:
+            return None
+        started = time.perf_counter()
+        try:
+            match = self.history.lookup(request.text)
+        except Exception as e:
+            print(f"Error searching correction history: {e}")
+            return None
+        self.metrics.observe('history_lookup', time.perf_counter() - started)
+        if match is None:
+            self.metrics.count('history_misses')
+            return None
+        request.trace.info['history_similarity'] = round(match.similarity, 3)
+        if match.reusable:
+            self.metrics.count('history_reused')
+            request.source = 'history'
+            return match.corrected
+        self.metrics.count('history_examples')
+        request.example = (match.text, match.corrected)
+        return None
+
+    def _offline_fallback(self, request, error):
+        """Answer from the local corrector when the model cannot be reached"""
+        if self.local is None or not is_network_error(error) or request.first_char_at is not None:
+            raise error
+        print(f"Model unreachable, using the local correction: {error}")
+        self.local.record_offline()
+        self.metrics.count('offline_fallbacks')
+        request.source = 'offline'
+        return self.local.correct(request.text).text
+
+    def _correct_with_model(self, request, on_chunk=None):
+        """Correct through the model (or daemon), chunking long inputs"""
+        chunks = None
+        if estimate_tokens(request.text) > self.chunk_threshold:
+            chunks = chunk_text(request.text, self.chunk_tokens)
+        if chunks and len(chunks) > 1:
+            result = self.correct_chunked(request, chunks, on_chunk)
+            if request.first_char_at is None:
+                request.first_char_at = time.perf_counter()
+        elif on_chunk is not None and self.remote is None:
+            result = self.correct_stream(request, on_chunk)
+        else:
+            result = self.correct(request.text, request.trace, request.example)
+            request.first_char_at = time.perf_counter()
+            if on_chunk is not None and result and not request.cancelled:
+                self.dispatch(on_chunk, request, result)  # The remote answers in one piece
+        return result
+
+    def _finish(self, request, future, on_done, on_error):
+        """Hand the result of a finished request back to the UI thread"""
+        with self.lock:
+            self.pending.pop(request.id, None)
+            if self.latest is request:
+                self.latest = None
+            pending = len(self.pending)
+        if self.on_pending:
+            self.dispatch(self.on_pending, pending)
+        if request.cancelled or future.cancelled():
+            self.metrics.count('cancelled')
+            return
+        error = future.exception()
+        if error is not None:
+            self.metrics.count('errors')
+            if on_error:
+                self.dispatch(on_error, request, error)
+        elif on_done:
+            self.dispatch(on_done, request, future.result())
+
+    def shutdown(self):
+        """Cancel outstanding work and stop the worker pool"""
+        self.cancel_all()
+        if self.batcher is not None:
+            self.batcher.shutdown()
+        self.caller.shutdown()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.chunk_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,190 @@
+import hashlib
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import Counter, deque
+
+from app_paths import data_path
+from metrics import percentile
+
+# MinHash signature split into LSH bands: texts sharing any band are compared exactly.
+# With 8 bands of 4 rows a pair at Jaccard 0.8 is found 98.5% of the time, one at 0.3 rarely.
+BANDS = 8
+ROWS = 4
+SHINGLE_CHARS = 4
+MAX_HASH = (1 << 61) - 1  # Mersenne prime for the permutations
+
+# Seeded so signatures stay comparable across runs
+_rng = random.Random(20240611)
+PERMUTATIONS = [(_rng.randrange(1, MAX_HASH), _rng.randrange(0, MAX_HASH)) for _ in range(BANDS * ROWS)]
+
+# A past correction is a useful example above this similarity...
+EXAMPLE_THRESHOLD = 0.6
+# ...and is reused as is when the texts only differ in case, punctuation or spacing
+REUSE_THRESHOLD = 1.0
+
+# Candidates checked exactly per lookup, most shared bands first
+MAX_CANDIDATES = 16
+
+NON_WORD = re.compile(r"[^\w]+")
+
+
+def canonical(text):
+    """Lower-case words only, so case, punctuation and spacing do not matter"""
+    return " ".join(NON_WORD.sub(" ", text.lower()).split())
+
+
+def shingles(text):
+    """Set of hashed character shingles of the canonical text"""
+    text = canonical(text)
+    if len(text) <= SHINGLE_CHARS:
+        return {zlib.crc32(text.encode('utf-8'))}
+    return {zlib.crc32(text[i:i + SHINGLE_CHARS].encode('utf-8')) for i in range(len(text) - SHINGLE_CHARS + 1)}
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def band_keys(shingle_set):
+    """LSH bucket key of every band of the text's MinHash signature"""
+    signature = [min((a * value + b) % MAX_HASH for value in shingle_set) for a, b in PERMUTATIONS]
+    keys = []
+    for band in range(BANDS):
+        rows = struct.pack(f"<B{ROWS}Q", band, *signature[band * ROWS:(band + 1) * ROWS])
+        keys.append(struct.unpack("<q", hashlib.blake2b(rows, digest_size=8).digest())[0])
+    return keys
+
+
+class HistoryMatch:
+    """The closest past correction found for a text"""
+
+    def __init__(self, text, corrected, similarity):
+        self.text = text
+        self.corrected = corrected
+        self.similarity = similarity
+
+    @property
+    def reusable(self):
+        return self.similarity >= REUSE_THRESHOLD
+
+
+class CorrectionHistory:
+    """Every corrected text on disk, with a MinHash LSH index for near-duplicate lookup
+
+    Each entry stores its band keys, so evicting the oldest entries once
+    max_entries is reached removes exactly their index rows.
+    """
+
+    def __init__(self, path=None, max_entries=200_000, window=500):
+        self.path = path or data_path("history.sqlite3")
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.reuses = 0
+        self.latencies = deque(maxlen=window)  # Recent lookup durations in seconds
+
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id INTEGER PRIMARY KEY, input TEXT NOT NULL, corrected TEXT NOT NULL, created REAL NOT NULL, "
+            "bands BLOB NOT NULL)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS lsh (key INTEGER NOT NULL, id INTEGER NOT NULL, "
+            "PRIMARY KEY (key, id)) WITHOUT ROWID"
+        )
+        self.db.commit()
+        self.entries = self.db.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def add(self, text, corrected, commit=True):
+        """Store a correction and index it"""
+        keys = band_keys(shingles(text))
+        with self.lock:
+            cursor = self.db.execute(
+                "INSERT INTO history (input, corrected, created, bands) VALUES (?, ?, ?, ?)",
+                (text, corrected, time.time(), struct.pack(f"<{BANDS}q", *keys))
+            )
+            self.db.executemany("INSERT OR IGNORE INTO lsh (key, id) VALUES (?, ?)",
+                                [(key, cursor.lastrowid) for key in keys])
+            self.entries += 1
+            if self.entries > self.max_entries:
+                self._evict(self.entries - self.max_entries)
+            if commit:
+                self.db.commit()
+
+    def commit(self):
+        with self.lock:
+            self.db.commit()
+
+    def lookup(self, text):
+        """Return the most similar past correction above EXAMPLE_THRESHOLD, or None"""
+        started = time.perf_counter()
+        shingle_set = shingles(text)
+        keys = band_keys(shingle_set)
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT id FROM lsh WHERE key IN ({','.join('?' * len(keys))})", keys
+            ).fetchall()
+            candidates = [entry_id for entry_id, _ in Counter(row[0] for row in rows).most_common(MAX_CANDIDATES)]
+            entries = []
+            if candidates:
+                entries = self.db.execute(
+                    f"SELECT input, corrected FROM history WHERE id IN ({','.join('?' * len(candidates))})",
+                    candidates
+                ).fetchall()
+
+        best = None
+        for past_input, corrected in entries:
+            similarity = jaccard(shingle_set, shingles(past_input))
+            if similarity >= EXAMPLE_THRESHOLD and (best is None or similarity > best.similarity):
+                best = HistoryMatch(past_input, corrected, similarity)
+
+        with self.lock:
+            self.lookups += 1
+            if best is not None:
+                self.hits += 1
+                if best.reusable:
+                    self.reuses += 1
+            self.latencies.append(time.perf_counter() - started)
+        return best
+
+    def stats(self):
+        """Entries, index size on disk, hit rate and lookup latency"""
+        with self.lock:
+            page_size = self.db.execute("PRAGMA page_size").fetchone()[0]
+            pages = self.db.execute("PRAGMA page_count").fetchone()[0]
+            index_rows = self.db.execute("SELECT COUNT(*) FROM lsh").fetchone()[0]
+            latencies = sorted(self.latencies)
+            lookups, hits, reuses, entries = self.lookups, self.hits, self.reuses, self.entries
+        return {
+            'entries': entries,
+            'index_rows': index_rows,
+            'size_bytes': page_size * pages,
+            'lookups': lookups,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'reused': reuses,
+            'lookup_p50_ms': round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+            'lookup_p95_ms': round(percentile(latencies, 95) * 1000, 3) if latencies else None,
+        }
+
+    def close(self):
+        with self.lock:
+            self.db.commit()
+            self.db.close()
+
+    def _evict(self, count):
+        """Drop the oldest count entries and their index rows (lock held)"""
+        rows = self.db.execute("SELECT id, bands FROM history ORDER BY id LIMIT ?", (count,)).fetchall()
+        for entry_id, bands in rows:
+            self.db.executemany("DELETE FROM lsh WHERE key = ? AND id = ?",
+                                [(key, entry_id) for key in struct.unpack(f"<{BANDS}q", bands)])
+        self.db.executemany("DELETE FROM history WHERE id = ?", [(entry_id,) for entry_id, _ in rows])
+        self.entries -= len(rows)
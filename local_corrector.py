@@ -0,0 +1,372 @@
+import mmap
+import os
+import re
+import threading
+from collections import Counter
+
+from app_paths import data_path
+
+# Local answers are only used when every fix is at least this likely
+CONFIDENCE_THRESHOLD = 0.9
+
+# Spelling fixes are only trusted once the dictionary knows this many words
+MIN_DICTIONARY_WORDS = 3000
+
+# Longer texts need more than mechanical fixes and always go to the model
+MAX_LOCAL_WORDS = 30
+
+# Corrections the model produced that a local result may match, oldest forgotten first
+MAX_KNOWN_CORRECTIONS = 50_000
+
+INDEX_HEADER = b"#fix-my-english spelling index v1"
+WORD = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?")
+
+# Common mistakes with a single safe fix: (pattern, replacement); matched case-insensitively
+RULES = [(re.compile(pattern, re.IGNORECASE), replacement) for pattern, replacement in (
+    (r"\bi\b", "I"),
+    (r"\bi'(m|ve|ll|d)\b", r"I'\1"),
+    (r"\bim\b", "I'm"),
+    (r"\bdont\b", "don't"),
+    (r"\bdoesnt\b", "doesn't"),
+    (r"\bdidnt\b", "didn't"),
+    (r"\bcant\b", "can't"),
+    (r"\bwont\b", "won't"),
+    (r"\bisnt\b", "isn't"),
+    (r"\bwasnt\b", "wasn't"),
+    (r"\bshouldnt\b", "shouldn't"),
+    (r"\bcouldnt\b", "couldn't"),
+    (r"\bwouldnt\b", "wouldn't"),
+    (r"\bthats\b", "that's"),
+    (r"\balot\b", "a lot"),
+    (r"\b(could|should|would|must) of\b", r"\1 have"),
+    (r"\brecieve(d|s)?\b", r"receive\1"),
+    (r"\bdefinately\b", "definitely"),
+    (r"\bseperate(ly)?\b", r"separate\1"),
+    (r"\buntill\b", "until"),
+    (r"\btomorow\b", "tomorrow"),
+    (r"\baccomodat(e|ion)\b", r"accommodat\1"),
+    (r"\boccured\b", "occurred"),
+    (r"\bwich\b", "which"),
+    (r"\bthier\b", "their"),
+    (r"\badress(es)?\b", r"address\1"),
+    (r"\bbuisness(es)?\b", r"business\1"),
+    (r"\bcalender\b", "calendar"),
+    (r"\bcollegue(s)?\b", r"colleague\1"),
+    (r"\bcomittee\b", "committee"),
+    (r"\benviroment\b", "environment"),
+    (r"\bneccessary\b", "necessary"),
+    (r"\brecomend(ed|s|ation)?\b", r"recommend\1"),
+    (r"\bsuccesful(ly)?\b", r"successful\1"),
+    (r"\bteh\b", "the"),
+    (r"\blooking forward to hear\b", "looking forward to hearing"),
+    (r"\bdiscuss about\b", "discuss"),
+)]
+
+SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+([,.!?;:])")
+REPEATED_SPACES = re.compile(r"[ \t]{2,}")
+
+
+def deletes(word):
+    """Every string one deletion away from word"""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def edit_distance_at_most_one(a, b):
+    """True when a and b differ by at most one insertion, deletion, substitution or adjacent swap"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+def fingerprint(text):
+    """Hash of the lower-cased words of text, so case, punctuation and spacing do not matter"""
+    return hash(" ".join(word.lower() for word in WORD.findall(text)))
+
+
+def collect_words(texts):
+    """Count the words in texts (for example corrections the model produced)"""
+    counts = Counter()
+    for text in texts:
+        counts.update(word.lower() for word in WORD.findall(text))
+    return counts
+
+
+def read_word_list(path):
+    """Read a "word [frequency]" per line list; a missing file gives no words"""
+    counts = Counter()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if parts:
+                    counts[parts[0].lower()] += int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
+    except OSError:
+        pass
+    return counts
+
+
+def build_index(counts, path, max_candidates=16):
+    """Write a sorted SymSpell-style index of words and their single deletes
+
+    Each line is "key<TAB>frequency<TAB>candidates": frequency is non-zero
+    when key is a word itself and candidates are the words one deletion
+    away from key, most frequent first.
+    """
+    entries = {}
+    for word, freq in counts.items():
+        entries.setdefault(word, [0, []])[0] = freq
+        for delete in deletes(word):
+            entries.setdefault(delete, [0, []])[1].append(word)
+
+    lines = [INDEX_HEADER + f" words={len(counts)}\n".encode('ascii')]
+    for key in sorted(entries, key=lambda k: k.encode('utf-8')):
+        freq, candidates = entries[key]
+        candidates = sorted(candidates, key=lambda w: -counts[w])[:max_candidates]
+        lines.append(f"{key}\t{freq}\t{' '.join(candidates)}\n".encode('utf-8'))
+
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.writelines(lines)
+    return temp_path
+
+
+class SpellingIndex:
+    """Read-only view of a spelling index file through mmap, searched in place"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.map = None
+        self.words = 0
+        try:
+            self.file = open(path, 'rb')
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.close()  # Missing or empty index: every word is unknown
+            return
+        header = self.map[:self.map.find(b"\n")]
+        if header.startswith(INDEX_HEADER):
+            self.words = int(header.rsplit(b"=", 1)[-1])
+
+    def lookup(self, key):
+        """Return (frequency, candidates) for key, or (0, []) when it is not in the index"""
+        if self.map is None:
+            return 0, []
+        target = key.encode('utf-8')
+        data = self.map
+        lo, hi = 0, len(data)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = data.rfind(b"\n", 0, mid) + 1  # Start of the line holding mid; never before lo
+            end = data.find(b"\n", start)
+            if end < 0:
+                end = len(data)
+            line = data[start:end]
+            line_key, _, rest = line.partition(b"\t")
+            if line_key < target:
+                lo = end + 1
+            elif line_key > target:
+                hi = start
+            else:
+                freq, _, candidates = rest.partition(b"\t")
+                return int(freq), candidates.decode('utf-8').split()
+        return 0, []
+
+    def frequency(self, word):
+        return self.lookup(word)[0]
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class LocalResult:
+    def __init__(self, text, confidence, fixes):
+        self.text = text
+        self.confidence = confidence
+        self.fixes = fixes
+
+    @property
+    def confident(self):
+        return self.confidence >= CONFIDENCE_THRESHOLD
+
+
+class LocalCorrector:
+    """Offline correction stage: rule table, spelling index and basic capitalization
+
+    correct() always returns a best-effort LocalResult; its confidence says
+    whether it can be used instead of asking the model. Spelling alone says
+    nothing about grammar, so a result is only confident when it matches a
+    correction the model produced before (remember() and rebuild()).
+    """
+
+    def __init__(self, path=None, max_known=MAX_KNOWN_CORRECTIONS):
+        self.path = path or data_path("spelling.idx")
+        self.lock = threading.Lock()
+        self.index = SpellingIndex(self.path)
+        self.max_known = max_known
+        self.known = {}  # Fingerprints of model corrections, in insertion order
+        self.answered = 0
+        self.deferred = 0
+        self.offline = 0
+
+    def rebuild(self, texts=(), word_list=None):
+        """Rebuild the index from corrected texts and an optional word list, then reload it"""
+        texts = list(texts)
+        counts = collect_words(texts)
+        counts.update(read_word_list(word_list or data_path("words.txt")))
+        for _, replacement in RULES:
+            counts.update(word.lower() for word in WORD.findall(replacement))
+        temp_path = build_index(counts, self.path)
+        with self.lock:
+            # The mapping has to be closed before the file can be replaced on Windows
+            self.index.close()
+            os.replace(temp_path, self.path)
+            self.index = SpellingIndex(self.path)
+        for text in texts:
+            self.remember(text)
+        return len(counts)
+
+    def remember(self, corrected):
+        """Note a correction the model produced, so an identical local result can be trusted"""
+        key = fingerprint(corrected)
+        with self.lock:
+            self.known.pop(key, None)
+            self.known[key] = True
+            while len(self.known) > self.max_known:
+                del self.known[next(iter(self.known))]
+
+    def correct(self, text):
+        """Return a LocalResult for text"""
+        fixes = []
+        confidence = 1.0
+        if len(WORD.findall(text)) > MAX_LOCAL_WORDS or "\n" in text.strip():
+            confidence = 0.0
+
+        corrected = text.strip()
+        for pattern, replacement in RULES:
+            fixed = pattern.sub(lambda match: _keep_case(match, replacement), corrected)
+            if fixed != corrected:
+                fixes.append(pattern.pattern)
+                corrected = fixed
+
+        with self.lock:
+            spelled, word_confidence, spelling_fixes = self._fix_spelling(corrected)
+        corrected = spelled
+        fixes.extend(spelling_fixes)
+        confidence = min(confidence, word_confidence)
+
+        corrected = REPEATED_SPACES.sub(" ", SPACE_BEFORE_PUNCTUATION.sub(r"\1", corrected))
+        if corrected and corrected[0].islower():
+            corrected = corrected[0].upper() + corrected[1:]
+        if corrected and corrected[-1].isalnum():
+            corrected += "."
+
+        # Without a matching past model correction there is no evidence that mechanical fixes are enough
+        with self.lock:
+            if self.index.words < MIN_DICTIONARY_WORDS or fingerprint(corrected) not in self.known:
+                confidence = 0.0
+        return LocalResult(corrected, confidence, fixes)
+
+    def _fix_spelling(self, text):
+        """Replace unknown words by their single most likely neighbour"""
+        confidence = 1.0
+        fixes = []
+
+        def replace(match):
+            nonlocal confidence
+            word = match.group(0)
+            lower = word.lower()
+            if self.index.frequency(lower) or lower in ("i", "a"):
+                return word
+            if self.index.words < MIN_DICTIONARY_WORDS:
+                confidence = 0.0  # Too few known words to tell a typo from a rare word
+                return word
+            best, best_confidence = self._best_candidate(lower)
+            confidence = min(confidence, best_confidence)
+            if best is None:
+                return word
+            fixes.append(f"{lower}->{best}")
+            return _match_case(word, best)
+
+        return WORD.sub(replace, text), confidence, fixes
+
+    def _best_candidate(self, word):
+        """Return (candidate, confidence) for an unknown word"""
+        scores = {}
+        _, inserted = self.index.lookup(word)  # Words with one more letter
+        for candidate in inserted:
+            scores[candidate] = self.index.frequency(candidate)
+        for delete in deletes(word):
+            freq, neighbours = self.index.lookup(delete)
+            if freq:
+                scores[delete] = freq  # The word has one letter too many
+            for candidate in neighbours:
+                if candidate not in scores and edit_distance_at_most_one(word, candidate):
+                    scores[candidate] = self.index.frequency(candidate)
+        scores = {candidate: freq for candidate, freq in scores.items() if freq}
+        if not scores:
+            return None, 0.0
+        best = max(scores, key=scores.get)
+        return best, scores[best] / sum(scores.values())
+
+    def record(self, answered):
+        """Count whether a request was answered locally or deferred to the model"""
+        with self.lock:
+            if answered:
+                self.answered += 1
+            else:
+                self.deferred += 1
+
+    def record_offline(self):
+        with self.lock:
+            self.offline += 1
+
+    def stats(self):
+        """Return local-vs-model counters"""
+        with self.lock:
+            total = self.answered + self.deferred
+            return {
+                'dictionary_words': self.index.words,
+                'known_corrections': len(self.known),
+                'answered_locally': self.answered,
+                'deferred_to_model': self.deferred,
+                'local_hit_rate': self.answered / total if total else 0.0,
+                'offline_fallbacks': self.offline,
+            }
+
+    def close(self):
+        with self.lock:
+            self.index.close()
+
+
+def _match_case(original, word):
+    if original.isupper() and len(original) > 1:
+        return word.upper()
+    if original[0].isupper():
+        return word[0].upper() + word[1:]
+    return word
+
+
+def _keep_case(match, replacement):
+    """Expand a rule replacement, keeping a capital first letter from the input"""
+    text = match.expand(replacement)
+    if match.group(0)[0].isupper() and text[0].islower():
+        text = text[0].upper() + text[1:]
+    return text
@@ -1,53 +1,131 @@
+import time
+_process_started = time.perf_counter()  # Reference point for --profile-startup
+
 import keyboard
 import tkinter as tk
 from tkinter import Frame, Text, Label, messagebox, Canvas
 from tkinter import ttk
 import threading
-import pyautogui
-import pystray
+import argparse
 import os
 import sys
-import google.generativeai as genai
-from PIL import Image, ImageDraw, ImageFont
-import re
+from app_paths import data_path
+from startup_profile import StartupProfiler
+import batch_correct
+from markdown_text import markdown_to_plain_text
+from correction_engine import CorrectionEngine, create_model, MODEL_NAME
+from model_router import ModelRouter
+from correction_cache import CorrectionCache
+from correction_history import CorrectionHistory
+from local_corrector import LocalCorrector
+import correction_daemon
+import memory_monitor
+from correction_daemon import DaemonClient
+from tip_bank import TipBank, TipPrefetcher, TIPS_INSTRUCTION, TIPS_PROMPT, split_tips
+from output_sinks import SinkRouter, PyAutoGuiSink, ClipboardPasteSink, BatchedKeySink, press_key
+from animation import FadeAnimator
+from window_focus import FocusWatcher, get_foreground_window
+from speculation import DraftSpeculator
+from selection_edit import SelectionGrabber, plan_edits, apply_plan
+from ui_dispatcher import UiDispatcher
+from metrics import Metrics, CorrectionTrace
+from memory_monitor import MemoryMonitor, SAMPLE_INTERVAL, format_report, tk_stats
+from tray_icons import TrayIconCache, MAX_BADGE, icon_variants
+
+# Heavy backends (google.generativeai, pystray, PIL, pyautogui) are imported on first use
+_imports_finished = time.perf_counter()
 
 class QuickInputApp:
-    def __init__(self):
+    def __init__(self, profiler=None, profile_startup=False, daemon_url=None):
+        # Time each startup phase; the report is printed with --profile-startup
+        self.profiler = profiler or StartupProfiler()
+        self.profile_startup = profile_startup
+        
+        # With a daemon URL corrections go to the shared correction daemon instead of a local model
+        self.daemon = DaemonClient(daemon_url) if daemon_url else None
+        
         # Initialize main variables
         self.input_visible = False
         self.input_value = ""
         self.service_running = True
+        self.streaming_enabled = False  # Type the correction while it is still being generated
+        self.local_fast_path = False  # Answer trivial fixes locally without calling the model
+        self.speculation_enabled = False  # Correct the draft in the background while it is typed
+        self.hedging_enabled = False  # Send a second request when a model call is unusually slow
+        self.routing_policy = 'fastest'  # Or 'quality': longer texts go to the best healthy model
         
         # Tips feature variables
         self.tips_enabled = False  # Disabled by default
         self.tips_timer = None
-        self.tips_window = None
+        self.tips_window = None  # Built on the first tip, then hidden and shown again
+        self.tips_visible = False
+        self.tip_window_size = (400, 300)
+        self.tip_text = None
+        self.mouse_over_tips = False
+        self.close_timer_id = None
+        self.geometry_cache = {}  # Window kind -> (screen size, geometry string)
+        self.input_geometry_applied = None
         self.tips_interval = 15 * 60 * 1000  # 5 minutes in milliseconds
+        self.tips_retry_interval = 30 * 1000  # Retry sooner while the tip bank is empty
         
         # Set up the main window
-        self.root = tk.Tk()
-        self.root.withdraw()  # Hide main window
+        with self.profiler.phase('create Tk root'):
+            self.root = tk.Tk()
+            self.root.withdraw()  # Hide main window
+        
+        # Other threads (hotkey, tray, workers) hand UI work to the Tk thread through this queue
+        self.ui = UiDispatcher(self.root)
         
         # Configure custom scrollbar style
         self.configure_scrollbar_style()
         
+        # Choose how corrected text reaches the focused app ("auto" picks by length)
+        self.output = SinkRouter([
+            PyAutoGuiSink(),
+            ClipboardPasteSink(self.root),
+            BatchedKeySink()
+        ])
+        
         # Create the input window
-        self.setup_input_window()
+        with self.profiler.phase('build input window'):
+            self.setup_input_window()
         
-        # Register the global hotkey
-        self.register_hotkey()
+        # Fades run on after() callbacks; typing waits until focus is back on the target app
+        self.animator = FadeAnimator(self.input_window)
+        self.focus_watcher = FocusWatcher(self.root)
         
-        # Start a thread to handle keyboard events
+        # Selection mode copies the selected text and corrects it in place
+        self.selection_grabber = SelectionGrabber(self.root)
+        self.selection_target = None
+        self.target_focused = True
+        self.pending_output = []  # Corrections that arrived before focus returned
+        
+        # Per-correction timing spans, summarized in the tray and logged to a rotating JSONL file
+        self.metrics = Metrics(data_path('metrics.jsonl'))
+        self.hotkey_pressed_at = None
+        self.trace = None  # Trace of the input window that is currently open
+        
+        # Register the global hotkey
+        with self.profiler.phase('register hotkey'):
+            self.register_hotkey()
         self.running = True
-        self.keyboard_thread = threading.Thread(target=self.keyboard_listener)
-        self.keyboard_thread.daemon = True
-        self.keyboard_thread.start()
         
-        # Create and show the system tray icon
+        # Create and show the system tray icon (built on its own thread)
+        self.icon = None
+        self.tray_icons = None
+        self.tray_icon_key = None
+        self.tray_status = 'idle'  # Or 'error' / 'offline' after the last correction
+        self.in_flight_count = 0
+        self.tray_ready = threading.Event()
         self.setup_tray_icon()
         
+        # The Gemini model is created on first use or by the background warm-up
+        self.model = None
+        self.tips_model = None
+        self.model_lock = threading.Lock()
+        
         # Set up Google Generative AI
-        if "GOOGLE_API_KEY" not in os.environ:
+        if self.daemon is None and "GOOGLE_API_KEY" not in os.environ:
             try:
                 if not os.path.exists('api.key'):
                     messagebox.showerror('Error', 'api.key file not found! Please create the file with your Google API key.')
@@ -64,12 +142,131 @@ class QuickInputApp:
                 messagebox.showerror('Error', f'Failed to read api.key: {str(e)}')
                 return
         
-        # Initialize the model
-        genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
-        self.model = genai.GenerativeModel('gemini-2.0-flash-lite')
+        # Cache corrections in memory and on disk so repeated phrases skip the model
+        # (the daemon keeps its own cache, shared by all of its clients)
+        self.correction_cache = None
+        if self.daemon is None:
+            try:
+                with self.profiler.phase('open correction cache'):
+                    self.correction_cache = CorrectionCache()
+            except Exception as e:
+                print(f"Error opening correction cache: {e}")
+        
+        # Every past correction, searched for near-duplicates before the model is asked
+        self.correction_history = None
+        if self.daemon is None:
+            try:
+                with self.profiler.phase('open correction history'):
+                    self.correction_history = CorrectionHistory()
+            except Exception as e:
+                print(f"Error opening correction history: {e}")
+        
+        # Offline spelling and rule stage; also used when the model cannot be reached
+        self.local_corrector = LocalCorrector()
+        
+        # Pick a model per request from input size and observed latency (the daemon routes on its own)
+        self.router = None
+        if self.daemon is None:
+            self.router = ModelRouter(self.create_routed_model, policy=self.routing_policy, metrics=self.metrics)
+        
+        # Run corrections on a worker pool and hand results back to the Tk thread
+        self.correction_engine = CorrectionEngine(
+            self.get_model,
+            dispatch=self.ui.post,
+            cache=self.correction_cache,
+            metrics=self.metrics,
+            remote=self.daemon,
+            local=self.local_corrector,
+            local_first=self.local_fast_path,
+            hedge=self.hedging_enabled,
+            router=self.router,
+            on_pending=self.on_pending_changed,
+            history=self.correction_history
+        )
+        
+        # Debounced, rate-limited corrections of the draft so Ctrl+Enter rarely waits
+        self.speculator = DraftSpeculator(self.root, self.correction_engine,
+                                          lambda: self.input_field.get("1.0", tk.END))
+        
+        # Keep a persisted bank of ready tips, refilled in the background
+        self.tip_bank = TipBank()
+        self.tip_prefetcher = TipPrefetcher(self.tip_bank, self.get_english_tips)
+        
+        # RSS trend for the Memory report; tracemalloc only starts when the report is first opened
+        self.memory_monitor = MemoryMonitor()
+        self.sample_memory()
         
         # Initialize the tips feature
         self.setup_tips_feature()
+        
+        # Once the event loop is idle the app is usable; warm up the model behind it
+        self.root.after_idle(self.on_startup_idle)
+    
+    def on_startup_idle(self):
+        """Mark startup as done and initialize the remaining backends in the background"""
+        self.profiler.mark_ready()
+        self.ui.drain()  # Run anything posted before the event loop started
+        threading.Thread(target=self.warm_up_backends, daemon=True).start()
+    
+    def warm_up_backends(self):
+        """Create the model ahead of the first request and report startup timings"""
+        if self.daemon is not None:
+            with self.profiler.phase('check correction daemon'):
+                if not self.daemon.available():
+                    print("Correction daemon is not reachable; corrections will fail until it is started")
+        else:
+            try:
+                self.get_model()
+            except Exception as e:
+                print(f"Error initializing model: {e}")
+        self.rebuild_spelling_index()
+        if self.profile_startup:
+            self.tray_ready.wait(10)
+            self.report_startup_profile()
+    
+    def rebuild_spelling_index(self):
+        """Refresh the local spelling index from past corrections (background thread)"""
+        try:
+            with self.profiler.phase('rebuild spelling index'):
+                texts = self.correction_cache.values() if self.correction_cache else ()
+                self.local_corrector.rebuild(texts)
+        except Exception as e:
+            print(f"Error rebuilding spelling index: {e}")
+    
+    def get_model(self):
+        """Return the Gemini model, creating it on first use"""
+        if self.model is None:
+            with self.model_lock:
+                if self.model is None:
+                    with self.profiler.phase('import google.generativeai'):
+                        import google.generativeai  # Timed on its own; create_model reuses the module
+                    with self.profiler.phase('create Gemini model'):
+                        self.model = create_model()
+        return self.model
+    
+    def get_tips_model(self):
+        """Return the Gemini model set up with the tips instructions, creating it on first use"""
+        if self.tips_model is None:
+            with self.model_lock:
+                if self.tips_model is None:
+                    self.tips_model = create_model(system_instruction=TIPS_INSTRUCTION)
+        return self.tips_model
+    
+    def create_routed_model(self, model_name):
+        """Client factory for the model router; the default model is created only once"""
+        if model_name == MODEL_NAME:
+            return self.get_model()
+        return create_model(model_name=model_name)
+    
+    def report_startup_profile(self):
+        """Print the startup phase timings and save them next to the caches"""
+        report = self.profiler.report()
+        print(report)
+        try:
+            with open(data_path('startup_profile.txt'), 'w') as f:
+                f.write(report + "\n")
+        except OSError as e:
+            print(f"Error saving startup profile: {e}")
     
     def setup_input_window(self):
         """Set up the floating input window"""
@@ -147,7 +344,8 @@ class QuickInputApp:
         
         # Bind keyboard events
         self.input_field.bind("<Control-Return>", self.on_ctrl_enter_pressed)
-        self.input_field.bind("<Escape>", self.hide_input)
+        self.input_field.bind("<Escape>", self.on_escape_pressed)
+        self.input_field.bind("<KeyRelease>", self.on_draft_edited)
         
         # Add a small label to indicate how to submit with improved styling
         self.hint_label = Label(self.frame, text="Press Ctrl+Enter to submit or Esc to cancel", 
@@ -212,35 +410,60 @@ class QuickInputApp:
         self.input_window.geometry(f"+{x}+{y}")
     
     def setup_tray_icon(self):
-        """Set up the system tray icon with a menu"""
-        icon_image = self.create_tray_icon_image()
-        
-        # Create the menu items
+        """Set up the system tray icon on its own thread so startup does not wait for it"""
+        threading.Thread(target=self.run_tray_icon, daemon=True).start()
+    
+    def run_tray_icon(self):
+        """Build the system tray icon with a menu and run it (tray thread)"""
+        with self.profiler.phase('import pystray'):
+            import pystray
+        with self.profiler.phase('load tray icons'):
+            icon_image = self.create_tray_icon_image()
+        
+        # Menu callbacks run on the tray thread, so each one is posted to the Tk thread
+        ui = self.ui.wrap
         menu = (
             pystray.MenuItem('Quick Input App', None, enabled=False),
             pystray.MenuItem('Service Status', None, enabled=False),
             pystray.MenuItem('Running', lambda: None, checked=lambda item: self.service_running),
-            pystray.MenuItem('Start Service', self.start_service, enabled=lambda item: not self.service_running),
-            pystray.MenuItem('Stop Service', self.stop_service, enabled=lambda item: self.service_running),
-            pystray.MenuItem('Show Input', self.show_input, enabled=lambda item: self.service_running),
+            pystray.MenuItem('Start Service', ui(self.start_service), enabled=lambda item: not self.service_running),
+            pystray.MenuItem('Stop Service', ui(self.stop_service), enabled=lambda item: self.service_running),
+            pystray.MenuItem('Show Input', ui(self.show_input), enabled=lambda item: self.service_running),
+            pystray.MenuItem('Streaming Output', ui(self.toggle_streaming), checked=lambda item: self.streaming_enabled),
+            pystray.MenuItem('Animations', ui(self.toggle_animations), checked=lambda item: self.animator.enabled),
+            pystray.MenuItem('Local Fast Path', ui(self.toggle_local_fast_path), checked=lambda item: self.local_fast_path),
+            pystray.MenuItem('Hedge Slow Requests', ui(self.toggle_hedging), checked=lambda item: self.hedging_enabled),
+            pystray.MenuItem('Correct While Typing', ui(self.toggle_speculation), checked=lambda item: self.speculation_enabled),
+            pystray.MenuItem('Model Routing', pystray.Menu(
+                self.routing_policy_item('Fastest', 'fastest'),
+                self.routing_policy_item('Best Quality', 'quality')
+            )),
+            pystray.MenuItem('Output Method', pystray.Menu(
+                self.output_method_item('Auto (by length)', 'auto'),
+                self.output_method_item('Type', 'type'),
+                self.output_method_item('Paste', 'paste'),
+                self.output_method_item('Batched Keys', 'batched')
+            )),
+            pystray.MenuItem('Stats', ui(self.show_stats)),
+            pystray.MenuItem('Memory', ui(self.show_memory)),
             pystray.MenuItem('Tips Options', pystray.Menu(
-                pystray.MenuItem('Enable Tips (Every 15 min)', self.enable_tips, enabled=lambda item: not self.tips_enabled),
-                pystray.MenuItem('Disable Tips', self.disable_tips, enabled=lambda item: self.tips_enabled)
+                pystray.MenuItem('Enable Tips (Every 15 min)', ui(self.enable_tips), enabled=lambda item: not self.tips_enabled),
+                pystray.MenuItem('Disable Tips', ui(self.disable_tips), enabled=lambda item: self.tips_enabled)
             )),
-            pystray.MenuItem('Quit', self.quit_app)
+            pystray.MenuItem('Quit', ui(self.quit_app))
         )
         
-        # Create the icon
+        # Create the icon and run it on this thread
         self.icon = pystray.Icon("quick_input", icon_image, "Fix My Eng", menu)
-        
-        # Run the icon in a separate thread
-        threading.Thread(target=self.icon.run, daemon=True).start()
+        self.tray_ready.set()
+        self.icon.run()
     
     def register_hotkey(self):
         """Register the global hotkey based on service status"""
         if self.service_running:
             try:
-                keyboard.add_hotkey('ctrl+alt+space', self.toggle_input_field)
+                keyboard.add_hotkey('ctrl+alt+space', self.on_hotkey)
+                keyboard.add_hotkey('ctrl+alt+shift+space', self.on_selection_hotkey)
             except Exception as e:
                 print(f"Error registering hotkey: {e}")
         else:
@@ -255,7 +478,7 @@ class QuickInputApp:
             self.service_running = True
             self.register_hotkey()
             # Update the icon menu to reflect the new state
-            self.icon.update_menu()
+            self.update_tray_menu()
     
     def stop_service(self):
         """Stop the service to disable hotkey functionality"""
@@ -266,7 +489,68 @@ class QuickInputApp:
             if self.input_visible:
                 self.hide_input()
             # Update the icon menu to reflect the new state
-            self.icon.update_menu()
+            self.update_tray_menu()
+    
+    def on_hotkey(self):
+        """Hotkey callback (keyboard thread); the toggle itself runs on the Tk thread"""
+        self.hotkey_pressed_at = time.perf_counter()
+        self.ui.post(self.toggle_input_field)
+    
+    def on_selection_hotkey(self):
+        """Selection hotkey callback (keyboard thread)"""
+        self.hotkey_pressed_at = time.perf_counter()
+        self.ui.post(self.correct_selection)
+    
+    def correct_selection(self):
+        """Copy the selection of the focused app and correct it in place"""
+        if not self.service_running or self.input_visible:
+            return
+        self.selection_target = get_foreground_window()
+        self.selection_grabber.grab(self.on_selection_grabbed)
+    
+    def on_selection_grabbed(self, text):
+        """Submit the copied selection for correction"""
+        trace = CorrectionTrace()
+        if self.hotkey_pressed_at is not None:
+            trace.mark('hotkey', self.hotkey_pressed_at)
+            self.hotkey_pressed_at = None
+        if not text or not text.strip():
+            print("Nothing selected to correct")
+            return
+        self.correction_engine.submit(
+            text,
+            on_done=self.on_selection_corrected,
+            on_error=self.on_correction_error,
+            trace=trace
+        )
+    
+    def on_selection_corrected(self, request, corrected_text):
+        """Apply the correction to the still-selected text with the fewest key events"""
+        if request.cancelled:
+            return
+        if self.selection_target is not None and get_foreground_window() != self.selection_target:
+            print("Focus moved away from the selection; correction not applied")
+            self.metrics.record(request.trace, 'dismissed')
+            return
+        plan = plan_edits(request.text, corrected_text)
+        request.trace.mark('typing_start')
+        try:
+            if not plan.ops:
+                press_key('right')  # Nothing to change; just drop the selection
+            elif plan.use_paste():
+                self.output.sinks['paste'].write(plan.text)  # Replaces the selection in one operation
+                self.metrics.count('selection_pastes')
+            else:
+                apply_plan(plan, press_key, self.output.sinks['batched'].write)
+                self.metrics.count('selection_edits')
+                self.metrics.count('selection_key_events', plan.cost)
+        except Exception as e:
+            print(f"Error applying correction: {e}")
+            self.metrics.record(request.trace, 'error')
+            messagebox.showerror('Error', f'Failed to apply correction: {str(e)}')
+            return
+        request.trace.info['changed_words'] = plan.changed_words
+        self.finish_trace(request, plan.text)
     
     def toggle_input_field(self):
         """Show or hide the input field based on current state"""
@@ -283,28 +567,32 @@ class QuickInputApp:
         if not self.service_running:
             return  # Do nothing if service is stopped
             
-        # Update position to ensure it's centered on the current screen
-        screen_width = self.root.winfo_screenwidth()
-        screen_height = self.root.winfo_screenheight()
-        window_width = 400
-        window_height = 250  # Match the new height
-        x_position = (screen_width - window_width) // 2
-        y_position = (screen_height - window_height) // 2
+        started = time.perf_counter()
         
+        # Restore the last position, or center on the screen (recomputed only if its size changed)
         if self.last_position:
-            self.input_window.geometry(f"+{self.last_position[0]}+{self.last_position[1]}")  # Restore last position
+            geometry = f"+{self.last_position[0]}+{self.last_position[1]}"
         else:
-            self.input_window.geometry(f"{window_width}x{window_height}+{x_position}+{y_position}")
+            geometry = self.cached_geometry('input', self.input_geometry)
+        if geometry != self.input_geometry_applied:
+            self.input_window.geometry(geometry)
+            self.input_geometry_applied = geometry
+        
+        # Remember which window should receive the corrected text
+        self.focus_watcher.capture_target()
+        
+        # Start timing this correction from the hotkey press, if it came from one
+        self.trace = CorrectionTrace()
+        if self.hotkey_pressed_at is not None:
+            self.trace.mark('hotkey', self.hotkey_pressed_at)
+            self.hotkey_pressed_at = None
         
         # Clear previous input and show the window
         self.input_field.delete("1.0", tk.END)  # Clear text from line 1, character 0 to end
         self.input_window.deiconify()
         
-        # Apply a fade-in effect
-        for alpha in range(0, 96, 5):  # 0 to 95% in steps of 5%
-            self.input_window.attributes("-alpha", alpha/100)
-            self.input_window.update()
-            self.input_window.after(10)  # Short delay for animation
+        # Fade in without blocking the event loop
+        self.animator.fade_in()
         
         # Enhanced focus handling
         self.input_window.update_idletasks()  # Process all pending events
@@ -315,59 +603,287 @@ class QuickInputApp:
         self.input_field.mark_set("insert", "1.0")
         
         self.input_visible = True
+        self.trace.mark('window_visible')
+        self.metrics.observe('input_show', time.perf_counter() - started)
+    
+    def input_geometry(self, screen_width, screen_height):
+        """Geometry string centering the input window on the screen"""
+        window_width = 400
+        window_height = 250  # Match the new height
+        x_position = (screen_width - window_width) // 2
+        y_position = (screen_height - window_height) // 2
+        return f"{window_width}x{window_height}+{x_position}+{y_position}"
+    
+    def show_stats(self):
+        """Show latency percentiles and counters"""
+        report = self.metrics.summary()
+        if getattr(self, 'local_corrector', None):
+            local = self.local_corrector.stats()
+            report += (f"\n\nlocal hit rate: {local['local_hit_rate']:.0%} "
+                       f"({local['answered_locally']} local, {local['deferred_to_model']} to the model)\n"
+                       f"offline fallbacks: {local['offline_fallbacks']}\n"
+                       f"dictionary words: {local['dictionary_words']}, "
+                       f"known corrections: {local['known_corrections']}")
+        if getattr(self, 'correction_engine', None):
+            modes = self.correction_engine.timing_summary()
+            if modes:
+                report += "\n\n" + "\n".join(
+                    f"{mode}: first char {row['time_to_first_char'] * 1000:.0f} ms, "
+                    f"total {row['total_time'] * 1000:.0f} ms (avg of {row['count']})"
+                    for mode, row in modes.items())
+        written = [sink for sink in self.output.stats() if sink['writes']]
+        if written:
+            report += "\n\noutput: " + ", ".join(
+                f"{sink['sink']} {sink['chars_per_second']:.0f} chars/s ({sink['writes']} writes)" for sink in written)
+        if getattr(self, 'correction_history', None):
+            history = self.correction_history.stats()
+            lookup_ms = history['lookup_p95_ms']
+            report += (f"\n\nhistory: {history['entries']} entries, {history['size_bytes'] / 1e6:.1f} MB, "
+                       f"near-duplicate hit rate {history['hit_rate']:.0%} ({history['reused']} reused)"
+                       + (f", lookup p95 {lookup_ms:.1f} ms" if lookup_ms is not None else ""))
+        if getattr(self, 'router', None):
+            report += "\n\n" + self.router.summary()
+        if getattr(self, 'correction_engine', None):
+            resilience = self.correction_engine.caller.stats()
+            hedge_delay = resilience['hedge_delay_ms']
+            circuits = ", ".join(f"{key} {state}" for key, state in resilience['circuits'].items())
+            report += (f"\n\ncircuits: {circuits or 'none used yet'}\n"
+                       f"hedging: {'on' if resilience['hedging'] else 'off'}"
+                       + (f" after {hedge_delay:.0f} ms" if hedge_delay is not None else ""))
+        messagebox.showinfo('Stats', report)
+    
+    def sample_memory(self):
+        """Add the current RSS to the memory trend and schedule the next sample"""
+        self.memory_monitor.sample()
+        self.root.after(SAMPLE_INTERVAL, self.sample_memory)
+    
+    def memory_buffers(self):
+        """Size and limit of every in-process buffer, plus Tk's widgets, callbacks and timers"""
+        buffers = self.correction_engine.buffers()
+        buffers.update({
+            'ui queue': (self.ui.commands.qsize(), None),
+            'pending output': (len(self.pending_output), None),
+            'speculative results': (len(self.speculator.results), self.speculator.max_results),
+            'speculative in flight': (len(self.speculator.in_flight), None),
+            'tip bank': (len(self.tip_bank.tips), self.tip_bank.tips.maxlen),
+            'tip fingerprints': (len(self.tip_bank.seen), self.tip_bank.seen.maxlen),
+            'window geometries': (len(self.geometry_cache), 2),
+            'memory samples': (len(self.memory_monitor.samples), self.memory_monitor.samples.maxlen),
+        })
+        if self.tray_icons is not None:
+            buffers['tray icons'] = (len(self.tray_icons.images), len(icon_variants()))
+        for name, count in tk_stats(self.root).items():
+            buffers[f"tk {name.replace('_', ' ')}"] = (count, None)
+        return buffers
+    
+    def show_memory(self):
+        """Show RSS, buffer sizes and the allocators that grew since the last report"""
+        report = format_report(self.memory_monitor.stats(limit=8, buffers=self.memory_buffers()))
+        messagebox.showinfo('Memory', report)
     
     def hide_input(self, event=None):
         """Hide the input field"""
         # Store position before hiding
         self.last_position = (self.input_window.winfo_x(), self.input_window.winfo_y())
-        
-        # Apply a fade-out effect
-        for alpha in range(95, -1, -5):  # 95% to 0% in steps of 5%
-            self.input_window.attributes("-alpha", alpha/100)
-            self.input_window.update()
-            self.input_window.after(10)  # Short delay for animation
-            
-        self.input_window.withdraw()
         self.input_visible = False
+        if getattr(self, 'speculator', None):
+            self.speculator.stop()
+        
+        # A window closed without submitting still counts towards hotkey latency
+        if self.trace is not None:
+            self.metrics.record(self.trace, 'dismissed')
+            self.trace = None
+        
+        # Fade out, then withdraw; the event loop keeps running meanwhile
+        self.animator.fade_out(self.on_input_hidden)
+    
+    def on_input_hidden(self):
+        """Withdraw the input window once the fade-out finished"""
+        if not self.input_visible:
+            self.input_window.withdraw()
+    
+    def on_escape_pressed(self, event=None):
+        """Cancel any pending correction and hide the input field"""
+        self.cancel_correction()
+        self.hide_input()
     
     def on_ctrl_enter_pressed(self, event):
         """Handle when Ctrl+Enter is pressed in the input field"""
         self.input_value = self.input_field.get("1.0", tk.END).strip()  # Get all text from line 1, character 0 to end
         
-        # Hide the input window first
-        self.hide_input()
+        # Start the request right away; its result is held until focus is back
+        self.target_focused = False
+        self.pending_output = []
+        trace, self.trace = self.trace, None
+        self.auto_type_text(trace)
         
-        # Give a small delay to allow the window to close and focus to return to the previous application
-        self.root.after(300, self.auto_type_text)
+        # Hide the input window and wait for focus to return to the previous application
+        self.hide_input()
+        self.focus_watcher.wait_for_target(self.on_target_focused)
+        return "break"  # Keep the newline out of the text field
     
-    def auto_type_text(self):
-        """Auto-type the corrected text"""
+    def on_draft_edited(self, event=None):
+        """Restart the speculative correction timer after a keystroke in the draft"""
+        if self.speculation_enabled and event.keysym not in ('Return', 'Escape'):
+            self.speculator.schedule()
+    
+    def on_target_focused(self):
+        """Focus is back on the target app; type anything that already arrived"""
+        self.target_focused = True
+        pending, self.pending_output = self.pending_output, []
+        for callback, args in pending:
+            callback(*args)
+    
+    def auto_type_text(self, trace=None):
+        """Submit the input for correction; typing happens once the result is back"""
         if not self.input_value.strip():
+            if trace is not None:
+                self.metrics.record(trace, 'dismissed')
             return  # Don't type anything if the input was empty
         
+        # A draft corrected while it was typed is used once its last sentence is in
+        if self.speculation_enabled:
+            text = self.input_value
+            trace = trace or CorrectionTrace()
+            trace.mark('submit')
+            if self.speculator.resolve(text, lambda corrected: self.on_speculation_resolved(text, corrected, trace)):
+                return
+        self.submit_correction(self.input_value, trace)
+    
+    def submit_correction(self, text, trace=None):
+        """Send text to the correction engine, typing the result when it is back"""
+        # A new submission replaces any correction that is still in flight.
+        # In streaming mode each piece is typed as soon as it is ready.
+        streaming = self.streaming_enabled
+        self.correction_engine.submit(
+            text,
+            on_done=self.on_stream_done if streaming else self.on_correction_done,
+            on_error=self.on_correction_error,
+            on_chunk=self.on_correction_done if streaming else None,
+            trace=trace
+        )
+    
+    def on_speculation_resolved(self, text, corrected_text, trace):
+        """Type the speculative correction, or correct normally if a sentence failed"""
+        if corrected_text is None:
+            self.submit_correction(text, trace)
+            return
+        self.correction_engine.submit_ready(text, corrected_text, on_done=self.on_correction_done, trace=trace)
+    
+    def on_correction_done(self, request, corrected_text):
+        """Type the corrected text (runs on the Tk thread)"""
+        if request.cancelled:
+            return
+        if not self.target_focused:
+            self.pending_output.append((self.on_correction_done, (request, corrected_text)))
+            return
+        request.trace.mark('typing_start')
         try:
-            # Use a direct prompt approach instead of message chaining
-            prompt = f"Improve this text to make it more suitable for casual business English. Correct any grammar or spelling errors, and make it sound natural but still professional. Respond ONLY with the improved version, without explanations or additional content. The text is: {self.input_value}"
-            
-            # Generate response with direct prompt
-            response = self.model.generate_content(prompt)
-            
-            # Extract the content from the response
-            corrected_text = response.text.strip().replace('"', '').replace('\n', ' ')
-            
-            # Use pyautogui to type the text
-            # We use write instead of typewrite to handle special characters better
-            pyautogui.write(corrected_text)
+            self.output.write(corrected_text)
         except Exception as e:
             print(f"Error auto-typing text: {e}")
-            messagebox.showerror('Error', f'Failed to generate text: {str(e)}')
+            self.metrics.record(request.trace, 'error')
+            request.cancel()  # Stop typing the rest of a streamed correction
+            messagebox.showerror('Error', f'Failed to type text: {str(e)}')
+            return
+        if not request.streaming:
+            self.finish_trace(request, corrected_text)
+    
+    def on_stream_done(self, request, corrected_text):
+        """A streamed correction was fully typed (runs on the Tk thread)"""
+        if request.cancelled:
+            return
+        if not self.target_focused:
+            self.pending_output.append((self.on_stream_done, (request, corrected_text)))
+            return
+        self.finish_trace(request, corrected_text)
+    
+    def finish_trace(self, request, corrected_text):
+        """Record the timing spans of a correction that was typed"""
+        request.trace.mark('typing_done')
+        request.trace.info['chars_out'] = len(corrected_text)
+        self.set_tray_status('offline' if request.source == 'offline' else 'idle')
+        self.metrics.record(request.trace)
+    
+    def on_correction_error(self, request, error):
+        """Report a failed correction (runs on the Tk thread)"""
+        self.metrics.record(request.trace, 'error')
+        self.set_tray_status('error')
+        print(f"Error auto-typing text: {error}")
+        messagebox.showerror('Error', f'Failed to generate text: {str(error)}')
+    
+    def cancel_correction(self):
+        """Cancel the correction that is currently in flight, if any"""
+        if getattr(self, 'correction_engine', None):
+            self.correction_engine.cancel()
+    
+    def output_method_item(self, label, mode):
+        """Create a radio menu item that selects an output method"""
+        import pystray
+        return pystray.MenuItem(
+            label,
+            lambda: self.ui.post(self.set_output_method, mode),
+            checked=lambda item: self.output.mode == mode,
+            radio=True
+        )
+    
+    def routing_policy_item(self, label, policy):
+        """Create a radio menu item that selects a model routing policy"""
+        import pystray
+        return pystray.MenuItem(
+            label,
+            lambda: self.ui.post(self.set_routing_policy, policy),
+            checked=lambda item: self.routing_policy == policy,
+            radio=True
+        )
+    
+    def set_routing_policy(self, policy):
+        """Prefer the fastest model or the best quality one for longer texts"""
+        self.routing_policy = policy
+        if self.router is not None:
+            self.router.policy = policy
+        self.update_tray_menu()
+    
+    def set_output_method(self, mode):
+        """Select how corrected text is sent to the active application"""
+        self.output.mode = mode
+        self.update_tray_menu()
+    
+    def toggle_animations(self):
+        """Switch fades off for a zero-latency popup, or back on"""
+        self.animator.enabled = not self.animator.enabled
+        self.update_tray_menu()
+    
+    def toggle_local_fast_path(self):
+        """Switch answering confident trivial fixes locally on or off"""
+        self.local_fast_path = not self.local_fast_path
+        if getattr(self, 'correction_engine', None):
+            self.correction_engine.local_first = self.local_fast_path
+        self.update_tray_menu()
     
-    def keyboard_listener(self):
-        """Thread function to listen for keyboard events"""
-        while self.running:
-            # This thread keeps running to ensure keyboard events are processed
-            # The actual hotkey handling is done by the keyboard library
-            threading.Event().wait(0.1)
+    def toggle_hedging(self):
+        """Switch sending a second request for calls slower than the recent p95"""
+        self.hedging_enabled = not self.hedging_enabled
+        if getattr(self, 'correction_engine', None):
+            self.correction_engine.caller.hedge = self.hedging_enabled
+        self.update_tray_menu()
+    
+    def toggle_speculation(self):
+        """Switch background corrections of the draft on or off"""
+        self.speculation_enabled = not self.speculation_enabled
+        if not self.speculation_enabled:
+            self.speculator.stop()
+        self.update_tray_menu()
+    
+    def toggle_streaming(self):
+        """Switch between streamed and blocking corrections"""
+        self.streaming_enabled = not self.streaming_enabled
+        self.update_tray_menu()
+    
+    def update_tray_menu(self):
+        """Refresh the tray menu once the icon exists"""
+        if self.icon:
+            self.icon.update_menu()
     
     def quit_app(self):
         """Quit the application completely"""
@@ -381,8 +897,20 @@ class QuickInputApp:
         # Close any open tip window
         self.close_tip_window()
         
+        # Drop pending corrections and stop the worker pool
+        if getattr(self, 'correction_engine', None):
+            self.correction_engine.shutdown()
+        if getattr(self, 'correction_cache', None):
+            self.correction_cache.close()
+        if getattr(self, 'correction_history', None):
+            self.correction_history.close()
+        self.metrics.close()
+        if getattr(self, 'local_corrector', None):
+            self.local_corrector.close()
+        
         # Stop the icon
-        self.icon.stop()
+        if self.icon:
+            self.icon.stop()
         # Clean up keyboard hooks
         keyboard.unhook_all()
         # Destroy Tkinter windows
@@ -403,46 +931,42 @@ class QuickInputApp:
             keyboard.unhook_all()  # Clean up keyboard hooks
     
     def create_tray_icon_image(self):
-        """Create a modern icon for the system tray"""
-        # Create a rounded square icon with gradient
-        width = 64
-        height = 64
-        
-        # Create base image with transparency
-        image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-        dc = ImageDraw.Draw(image)
-        
-        # Draw a rounded rectangle
-        radius = 15
-        color1 = "#3498db"  # Start color - light blue
-        color2 = "#2980b9"  # End color - darker blue
-        
-        # Draw the rounded rectangle (simulated with multiple rectangles and ellipses)
-        dc.rectangle([radius, 0, width-radius, height], fill=color1)
-        dc.rectangle([0, radius, width, height-radius], fill=color1)
-        
-        # Draw the four corners
-        dc.ellipse([0, 0, radius*2, radius*2], fill=color1)
-        dc.ellipse([width-radius*2, 0, width, radius*2], fill=color1)
-        dc.ellipse([0, height-radius*2, radius*2, height], fill=color1)
-        dc.ellipse([width-radius*2, height-radius*2, width, height], fill=color1)
-        
-        # Add a "F" letter in the center
-        try:
-            # Try to use a font if available
-            font = ImageFont.truetype("arial.ttf", 32)
-            text_width, text_height = dc.textsize("F", font=font)
-            text_x = (width - text_width) // 2
-            text_y = (height - text_height) // 2
-            dc.text((text_x, text_y), "F", fill="white", font=font)
-        except:
-            # Fallback to drawing a simple F shape
-            margin = width // 4
-            dc.line([margin, margin, margin, height-margin], fill="white", width=3)
-            dc.line([margin, margin, width-margin, margin], fill="white", width=3)
-            dc.line([margin, height//2, width-margin, height//2], fill="white", width=3)
-        
-        return image
+        """Load the tray icons, rendering them only if they are not cached yet (tray thread)"""
+        self.tray_icons = TrayIconCache()
+        self.tray_icons.preload()
+        self.tray_icon_key = self.tray_icon_state()
+        return self.tray_icons.get(*self.tray_icon_key)
+    
+    def tray_icon_state(self):
+        """(state, in-flight count) the tray icon should show"""
+        if self.in_flight_count:
+            return 'busy', min(self.in_flight_count, MAX_BADGE)
+        return self.tray_status, 0
+    
+    def update_tray_icon(self):
+        """Switch to the cached icon for the current state; nothing is drawn here"""
+        if self.icon is None or self.tray_icons is None:
+            return  # The tray picks the current state up when it is created
+        key = self.tray_icon_state()
+        if key == self.tray_icon_key:
+            return
+        self.tray_icon_key = key
+        self.icon.icon = self.tray_icons.get(*key)
+        state, count = key
+        if count:
+            self.icon.title = f"Fix My Eng: {count} in progress"
+        else:
+            self.icon.title = "Fix My Eng" if state == 'idle' else f"Fix My Eng ({state})"
+    
+    def on_pending_changed(self, count):
+        """The number of corrections in flight changed (runs on the Tk thread)"""
+        self.in_flight_count = count
+        self.update_tray_icon()
+    
+    def set_tray_status(self, status):
+        """Show idle, error or offline in the tray once nothing is in flight"""
+        self.tray_status = status
+        self.update_tray_icon()
     
     def configure_scrollbar_style(self):
         """Configure custom scrollbar style to match the modern look"""
@@ -486,44 +1010,72 @@ class QuickInputApp:
             self.root.after_cancel(self.tips_timer)
             self.tips_timer = None
     
-    def schedule_next_tip(self):
+    def schedule_next_tip(self, delay=None):
         """Schedule the next tip to be shown"""
         if self.tips_timer is not None:
             self.root.after_cancel(self.tips_timer)
-        self.tips_timer = self.root.after(self.tips_interval, self.show_tip)
+        self.tips_timer = self.root.after(delay or self.tips_interval, self.show_tip)
     
     def show_tip(self):
-        """Show a tip in a popup window"""
+        """Show a tip in the popup window, building the window on first use"""
         if not self.tips_enabled:
             return
             
-        # Get a tip from Gemini AI
-        tip = self.get_english_tip()
+        # Take a ready tip from the bank and top it up in the background
+        tip = self.tip_bank.pop()
+        self.tip_prefetcher.ensure_filled()
         if not tip:
-            # If we couldn't get a tip, try again later
-            self.schedule_next_tip()
+            # The bank is still being filled, try again shortly
+            self.schedule_next_tip(self.tips_retry_interval)
             return
-            
-        # Close any existing tip window
-        self.close_tip_window()
-        
-        # Create a new tip window
-        self.tips_window = tk.Toplevel(self.root)
-        self.tips_window.overrideredirect(True)  # Remove window border
-        self.tips_window.attributes("-topmost", True)  # Always on top
         
-        # Variables for mouse tracking
+        started = time.perf_counter()
+        if self.tips_window is None:
+            self.build_tip_window()
+            self.metrics.observe('tip_build', time.perf_counter() - started)
+            started = time.perf_counter()
+        
+        # Only the content and position change between tips
+        self.tip_text.config(state="normal")
+        self.tip_text.delete("1.0", tk.END)
+        self.tip_text.insert("1.0", tip)
+        self.tip_text.config(state="disabled")  # Make it read-only
+        self.tip_text.yview_moveto(0)
+        self.tips_window.geometry(self.cached_geometry('tip', self.tip_geometry))
         self.mouse_over_tips = False
-        self.close_timer_id = None
+        self.tips_window.deiconify()
+        self.tips_window.lift()
+        self.tips_window.update_idletasks()
+        self.tips_visible = True
+        self.metrics.observe('tip_show', time.perf_counter() - started)
         
-        # Position the window in the top right corner
-        screen_width = self.root.winfo_screenwidth()
-        screen_height = self.root.winfo_screenheight()
-        window_width = 400
-        window_height = 300  # Increased height for longer tips
-        x_position = screen_width - window_width - 20
+        # Start the auto-close timer
+        self.reset_close_timer()
+        
+        # Schedule the next tip
+        self.schedule_next_tip()
+    
+    def tip_geometry(self, screen_width, screen_height):
+        """Geometry string placing the tip window in the top right corner"""
+        x_position = screen_width - self.tip_window_size[0] - 20
         y_position = 40
-        self.tips_window.geometry(f"{window_width}x{window_height}+{x_position}+{y_position}")
+        return f"{self.tip_window_size[0]}x{self.tip_window_size[1]}+{x_position}+{y_position}"
+    
+    def cached_geometry(self, kind, compute):
+        """Return compute(screen_width, screen_height), recomputed only when the screen size changes"""
+        screen = (self.root.winfo_screenwidth(), self.root.winfo_screenheight())
+        cached = self.geometry_cache.get(kind)
+        if cached is None or cached[0] != screen:
+            cached = self.geometry_cache[kind] = (screen, compute(*screen))
+        return cached[1]
+    
+    def build_tip_window(self):
+        """Build the tip window once; show_tip and close_tip_window only show and hide it"""
+        self.tips_window = tk.Toplevel(self.root)
+        self.tips_window.withdraw()
+        self.tips_window.overrideredirect(True)  # Remove window border
+        self.tips_window.attributes("-topmost", True)  # Always on top
+        window_width, window_height = self.tip_window_size
         
         # Create a canvas for rounded rectangle background
         canvas = tk.Canvas(self.tips_window, bg="#3498db", highlightthickness=0)
@@ -553,18 +1105,16 @@ class QuickInputApp:
         content_frame.pack(fill="both", expand=True, pady=5)
         
         # Add a scrollable text widget for the tip
-        tip_text = Text(content_frame, font=("Segoe UI", 10), bg="#ffffff", fg="#34495e",
-                       wrap="word", height=10, borderwidth=0, highlightthickness=0)
-        tip_text.insert("1.0", tip)
-        tip_text.config(state="disabled")  # Make it read-only
+        self.tip_text = Text(content_frame, font=("Segoe UI", 10), bg="#ffffff", fg="#34495e",
+                             wrap="word", height=10, borderwidth=0, highlightthickness=0)
         
         # Add scrollbar
-        scrollbar = ttk.Scrollbar(content_frame, orient="vertical", command=tip_text.yview)
-        tip_text.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(content_frame, orient="vertical", command=self.tip_text.yview)
+        self.tip_text.configure(yscrollcommand=scrollbar.set)
         
         # Pack the scrollbar and text widget
         scrollbar.pack(side="right", fill="y")
-        tip_text.pack(side="left", fill="both", expand=True)
+        self.tip_text.pack(side="left", fill="both", expand=True)
         
         # Add a close button
         close_button = Label(frame, text="×", font=("Segoe UI", 16, "bold"), 
@@ -575,12 +1125,6 @@ class QuickInputApp:
         # Bind mouse enter and leave events to track when mouse is over the window
         self.tips_window.bind("<Enter>", self.on_mouse_enter_tips)
         self.tips_window.bind("<Leave>", self.on_mouse_leave_tips)
-        
-        # Start the auto-close timer
-        self.reset_close_timer()
-        
-        # Schedule the next tip
-        self.schedule_next_tip()
     
     def on_mouse_enter_tips(self, event):
         """Called when mouse enters the tips window"""
@@ -605,87 +1149,78 @@ class QuickInputApp:
         self.close_timer_id = self.tips_window.after(10000, self.close_tip_window)
     
     def close_tip_window(self, force_close=False):
-        """Close the tip window if it exists and mouse is not over it"""
-        if self.tips_window:
+        """Hide the tip window if it is shown and mouse is not over it"""
+        if self.tips_visible:
             # Force close or only close if mouse is not over the window
             if force_close or not self.mouse_over_tips:
-                try:
-                    self.tips_window.destroy()
-                    self.tips_window = None
+                if self.close_timer_id:
+                    self.tips_window.after_cancel(self.close_timer_id)
                     self.close_timer_id = None
-                except:
-                    pass
+                self.tips_window.withdraw()  # Kept for the next tip
+                self.tips_visible = False
             else:
                 # If mouse is still over window, reset the timer
                 self.reset_close_timer()
     
-    def get_english_tip(self):
-        """Get an English speaking tip from Gemini AI"""
-        try:
-            prompt = """
-            create me single tips (but not too short), about how to be speak as professional in english, 
-            give me an explanantion In indonesia Language , and show me the example.
-            
-            your response should be not more than 300 characters.
-            """
-            
-            response = self.model.generate_content(prompt)
-            if response and hasattr(response, 'text'):
-                # Convert markdown to plain text
-                return self.markdown_to_plain_text(response.text.strip())
-            return "Failed to generate tip. Please try again later."
-        except Exception as e:
-            print(f"Error generating tip: {e}")
-            return None
+    def get_english_tips(self, count):
+        """Get several English speaking tips from Gemini AI with a single request"""
+        response = self.get_tips_model().generate_content(TIPS_PROMPT.format(count=count))
+        if not response or not hasattr(response, 'text'):
+            return []
+        self.metrics.count_tokens(response, prefix='tips_')
+        # Convert markdown to plain text
+        return [self.markdown_to_plain_text(tip) for tip in split_tips(response.text)]
     
     def markdown_to_plain_text(self, markdown_text):
         """Convert markdown text to plain text"""
-        # Remove headers (# Header)
-        text = re.sub(r'#+\s+(.*)', r'\1', markdown_text)
-        
-        # Remove bold (**text**)
-        text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-        
-        # Remove italic (*text*)
-        text = re.sub(r'\*(.*?)\*', r'\1', text)
-        
-        # Remove code blocks (```code```)
-        text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)
-        
-        # Remove inline code (`code`)
-        text = re.sub(r'`(.*?)`', r'\1', text)
-        
-        # Remove bullet points (- item)
-        text = re.sub(r'^\s*[-*+]\s+(.*?)$', r'\1', text, flags=re.MULTILINE)
-        
-        # Remove numbered lists (1. item)
-        text = re.sub(r'^\s*\d+\.\s+(.*?)$', r'\1', text, flags=re.MULTILINE)
-        
-        # Remove horizontal rules (---, ___, ***)
-        text = re.sub(r'^\s*[-_*]{3,}\s*$', '', text, flags=re.MULTILINE)
-        
-        # Remove links ([text](url))
-        text = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', text)
-        
-        # Remove extra newlines
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        
-        return text.strip()
+        return markdown_to_plain_text(markdown_text)
     
     def enable_tips(self):
         """Enable the tips feature"""
         self.tips_enabled = True
         self.setup_tips_feature()
-        self.icon.update_menu()
+        self.update_tray_menu()
     
     def disable_tips(self):
         """Disable the tips feature"""
         self.tips_enabled = False
         self.setup_tips_feature()
-        if self.tips_window:
-            self.close_tip_window()
-        self.icon.update_menu()
+        self.close_tip_window()
+        self.update_tray_menu()
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Fix My English quick input app")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='print per-phase import and initialization timings')
+    parser.add_argument('--daemon', nargs='?', const=correction_daemon.DEFAULT_URL, metavar='URL',
+                        help='send corrections to a running correction daemon')
+    commands = parser.add_subparsers(dest='command')
+    
+    # Headless batch mode: correct files, stdin or JSONL without the GUI
+    correct_parser = commands.add_parser('correct', help='correct files or stdin without the GUI')
+    batch_correct.add_arguments(correct_parser)
+    
+    # Daemon mode: one warm model and cache shared by the tray app, CLI and editor plugins
+    serve_parser = commands.add_parser('serve', help='run the local correction daemon')
+    correction_daemon.add_arguments(serve_parser)
+    
+    # Memory report of the running daemon, or a simulated week of use checked for growth
+    memory_parser = commands.add_parser('memory', help="show the daemon's memory or simulate days of use")
+    memory_monitor.add_arguments(memory_parser)
+    args = parser.parse_args()
+    
+    if args.command == 'correct':
+        sys.exit(batch_correct.run(args))
+    if args.command == 'serve':
+        sys.exit(correction_daemon.run(args))
+    if args.command == 'memory':
+        sys.exit(memory_monitor.run(args))
+    
+    profiler = StartupProfiler(_process_started)
+    profiler.record('module imports', _process_started, _imports_finished)
+    app = QuickInputApp(profiler=profiler, profile_startup=args.profile_startup, daemon_url=args.daemon)
+    app.run()
 
 if __name__ == "__main__":
-    app = QuickInputApp()
-    app.run()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,231 @@
+import operator
+import re
+
+# Patterns are compiled once, in the order the substitutions are applied
+HEADER = re.compile(r'#+\s+(.*)')
+BOLD = re.compile(r'\*\*(.*?)\*\*')
+ITALIC = re.compile(r'\*(.*?)\*')
+CODE_BLOCK = re.compile(r'```.*?```', re.DOTALL)
+CODE = re.compile(r'`(.*?)`')
+BULLET = re.compile(r'^\s*[-*+]\s+(.*?)$', re.MULTILINE)
+NUMBERED = re.compile(r'^\s*\d+\.\s+(.*?)$', re.MULTILINE)
+RULE = re.compile(r'^\s*[-_*]{3,}\s*$', re.MULTILINE)
+LINK = re.compile(r'\[(.*?)\]\(.*?\)')
+EXTRA_NEWLINES = re.compile(r'\n{3,}')
+
+# Single lines that may still be joined with the lines after them
+BARE_BULLET = re.compile(r'\s*[-*+]\s*')
+BARE_NUMBER = re.compile(r'\s*\d+\.\s*')
+RULE_LINE = re.compile(r'\s*[-_*]{3,}\s*')
+FENCE = "```"
+
+# Replacement for "keep the first group"; a C-level callable avoids re's template expansion per match
+_group1 = operator.itemgetter(1)
+
+# (pattern, replacement, marker) in order; a pass is skipped when its marker is absent
+PASSES = (
+    (HEADER, _group1, '#'),
+    (BOLD, _group1, '**'),
+    (ITALIC, _group1, '*'),
+    (CODE_BLOCK, '', FENCE),
+    (CODE, _group1, '`'),
+    (BULLET, _group1, None),
+    (NUMBERED, _group1, None),
+    (RULE, '', None),
+    (LINK, _group1, '['),
+)
+
+
+def _is_blank(line):
+    return not line or line.isspace()
+
+
+def _split_tail(text, keep):
+    """Split text before the longest run of trailing lines for which keep(line) holds
+
+    Returns (ready, held); either is None when it would contain no lines.
+    """
+    end = len(text)
+    cut = None
+    while True:
+        start = text.rfind("\n", 0, end) + 1
+        if not keep(text[start:end]):
+            break
+        cut = start
+        if start == 0:
+            break
+        end = start - 1
+    if cut is None:
+        return text, None
+    if cut == 0:
+        return None, text
+    return text[:cut - 1], text[cut:]
+
+
+class _Stage:
+    """One substitution applied to a stream of complete lines
+
+    Blocks of lines are pushed as text. Trailing lines that the pattern could
+    still join with the next block are held back until more input (or the
+    end of input) decides them, so the output is the same as applying the
+    substitution to the whole text at once.
+    """
+
+    def __init__(self, sink, pattern, replacement=_group1, marker=None, keep=None):
+        self.sink = sink
+        self.pattern = pattern
+        self.replacement = replacement
+        self.marker = marker  # Blocks without this text are passed through untouched
+        self.keep = keep  # Predicate for trailing lines that must be held back
+        self.held = None
+
+    def push(self, text):
+        if self.held is not None:
+            text = self.held + "\n" + text
+            self.held = None
+        if self.keep is not None:
+            text, self.held = _split_tail(text, self.keep)
+            if text is None:
+                return
+        self.sink.push(self.convert(text))
+
+    def convert(self, text):
+        if self.marker is not None and self.marker not in text:
+            return text
+        return self.pattern.sub(self.replacement, text)
+
+    def close(self):
+        if self.held is not None:
+            self.sink.push(self.convert(self.held))
+            self.held = None
+        self.sink.close()
+
+
+class _FenceStage:
+    """Removes ``` code blocks, holding back an unclosed one until it closes"""
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.prefix = ""  # Converted start of the line holding the open fence
+        self.opened = None  # Raw text from the open fence on
+
+    def push(self, text):
+        if self.opened is not None:
+            text = self.opened + "\n" + text
+        elif FENCE not in text:
+            self.sink.push(text)
+            return
+
+        # Everything before the first fence the pattern cannot close is final
+        last_end = 0
+        for match in CODE_BLOCK.finditer(text):
+            last_end = match.end()
+        start = text.find(FENCE, last_end)
+        if start < 0:
+            text, self.prefix, self.opened = self.prefix + CODE_BLOCK.sub('', text), "", None
+            self.sink.push(text)
+            return
+
+        converted = self.prefix + CODE_BLOCK.sub('', text[:start])
+        self.opened = text[start:]
+        line_start = converted.rfind("\n")
+        self.prefix = converted[line_start + 1:]
+        if line_start >= 0:
+            self.sink.push(converted[:line_start])
+
+    def close(self):
+        # An unclosed fence is left as plain text
+        if self.opened is not None:
+            self.sink.push(self.prefix + self.opened)
+            self.prefix, self.opened = "", None
+        self.sink.close()
+
+
+class _Emitter:
+    """Collapses 3+ newlines and strips the text as a whole"""
+
+    def __init__(self):
+        self.output = []
+        self.started = False
+        self.first = True
+        self.pending = ""  # Trailing whitespace that is only written if more text follows
+
+    def push(self, text):
+        if not self.first:
+            text = "\n" + text
+        self.first = False
+        content = text.rstrip()
+        if not content:
+            self.pending += text
+            return
+        trailing = text[len(content):]
+        if self.started:
+            content = self.pending + content
+        else:
+            content = content.lstrip()
+            self.started = True
+        if "\n\n\n" in content:
+            content = EXTRA_NEWLINES.sub('\n\n', content)
+        self.output.append(content)
+        self.pending = trailing
+
+    def close(self):
+        self.pending = ""
+
+    def take(self):
+        """Return and forget the text produced so far"""
+        text = "".join(self.output)
+        self.output = []
+        return text
+
+
+class MarkdownConverter:
+    """Streaming markdown to plain text converter
+
+    Input can be fed in arbitrary chunks (for example streamed model output);
+    feed() returns the plain text that is final so far and close() returns
+    the rest. The combined output is the same as markdown_to_plain_text.
+    """
+
+    def __init__(self):
+        self.emitter = _Emitter()
+        stage = _Stage(self.emitter, LINK, marker='[')
+        stage = _Stage(stage, RULE, '', keep=lambda line: _is_blank(line) or RULE_LINE.fullmatch(line))
+        stage = _Stage(stage, NUMBERED, keep=lambda line: _is_blank(line) or BARE_NUMBER.fullmatch(line))
+        stage = _Stage(stage, BULLET, keep=lambda line: _is_blank(line) or BARE_BULLET.fullmatch(line))
+        stage = _Stage(stage, CODE, marker='`')
+        stage = _FenceStage(stage)
+        stage = _Stage(stage, ITALIC, marker='*')
+        stage = _Stage(stage, BOLD, marker='**')
+        self.pipeline = _Stage(stage, HEADER, marker='#',
+                               keep=lambda line: _is_blank(line) or line.rstrip().endswith('#'))
+        self.partial = ""
+
+    def feed(self, chunk):
+        """Add a chunk of markdown and return the plain text that is ready"""
+        text = self.partial + chunk
+        end = text.rfind("\n")
+        if end < 0:
+            self.partial = text
+            return ""
+        self.partial = text[end + 1:]
+        self.pipeline.push(text[:end])
+        return self.emitter.take()
+
+    def close(self):
+        """Finish the input and return the remaining plain text"""
+        self.pipeline.push(self.partial)
+        self.partial = ""
+        self.pipeline.close()
+        return self.emitter.take()
+
+
+def markdown_to_plain_text(markdown_text):
+    """Convert markdown text to plain text"""
+    text = markdown_text
+    for pattern, replacement, marker in PASSES:
+        if marker is None or marker in text:
+            text = pattern.sub(replacement, text)
+    if "\n\n\n" in text:
+        text = EXTRA_NEWLINES.sub('\n\n', text)
+    return text.strip()
@@ -0,0 +1,336 @@
+import gc
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+
+# Allocation sites listed per section of a report
+TOP_ALLOCATORS = 10
+
+# RSS is sampled every SAMPLE_INTERVAL ms, keeping one day of samples for the trend line
+SAMPLE_INTERVAL = 10 * 60 * 1000
+MAX_SAMPLES = 144
+
+# tracemalloc's own bookkeeping and import machinery are not interesting allocators
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+# A simulated week passes when traced memory grows less than this after the first day
+MAX_DAILY_GROWTH = 256 * 1024
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where it cannot be read"""
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ('cb', wintypes.DWORD),
+                ('PageFaultCount', wintypes.DWORD),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        try:
+            if ctypes.windll.psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters),
+                                                        counters.cb):
+                return counters.WorkingSetSize
+        except (OSError, AttributeError):
+            pass
+        return None
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def format_bytes(size):
+    """Human-readable size, signed when it is a difference"""
+    if size is None:
+        return "n/a"
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024 or unit == "MB":
+            break
+        size /= 1024
+    return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+
+
+def tk_stats(root):
+    """Widgets, Python callbacks registered with Tcl and pending after() timers of a Tk app
+
+    Bindings and command= lambdas each register a Tcl command; a count that
+    keeps growing means callbacks are bound again without being released.
+    """
+    widgets = 0
+    stack = [root]
+    while stack:
+        widget = stack.pop()
+        widgets += 1
+        stack.extend(widget.winfo_children())
+    commands = root.tk.splitlist(root.tk.call('info', 'commands'))
+    return {
+        'widgets': widgets,
+        'tcl_callbacks': sum(1 for name in commands if name[:1].isdigit()),
+        'after_timers': len(root.tk.splitlist(root.tk.call('after', 'info'))),
+    }
+
+
+def _sites(stats, limit, diff=False):
+    """Top allocation sites of tracemalloc statistics as plain dicts"""
+    sites = []
+    for stat in stats:
+        if diff and not stat.size_diff:
+            continue
+        frame = stat.traceback[0]
+        site = {'where': f"{frame.filename}:{frame.lineno}", 'size_bytes': stat.size, 'count': stat.count}
+        if diff:
+            site.update(size_diff_bytes=stat.size_diff, count_diff=stat.count_diff)
+        sites.append(site)
+        if len(sites) >= limit:
+            break
+    return sites
+
+
+class MemoryMonitor:
+    """RSS trend plus tracemalloc snapshots of the running process
+
+    Tracing slows allocations down and costs memory of its own, so it only
+    starts with the first stats() call. Only the first and the latest
+    snapshot are kept: each report lists the top allocators, the growth
+    since the previous report and the growth since tracing started.
+    """
+
+    def __init__(self, frames=1, max_samples=MAX_SAMPLES):
+        self.frames = frames
+        self.samples = deque(maxlen=max_samples)  # (time, rss bytes)
+        self.baseline = None
+        self.previous = None
+        self.owns_tracing = False  # True when tracemalloc was started here
+
+    def sample(self):
+        """Record the current RSS in the trend and return it"""
+        rss = current_rss()
+        if rss is not None:
+            self.samples.append((time.time(), rss))
+        return rss
+
+    def start_tracing(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.owns_tracing = True
+
+    def stop_tracing(self):
+        """Stop tracing (if started here) and drop the snapshots"""
+        self.baseline = self.previous = None
+        if self.owns_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.owns_tracing = False
+
+    def snapshot(self):
+        """Take a filtered snapshot; return (snapshot, previous snapshot or None)"""
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        previous = self.previous
+        if self.baseline is None:
+            self.baseline = snapshot
+        self.previous = snapshot
+        return snapshot, previous
+
+    def stats(self, limit=TOP_ALLOCATORS, buffers=None):
+        """RSS, traced memory, top allocators and growth since the last call, as a dict
+
+        buffers maps names of in-process buffers to (size, limit) and is
+        reported as given.
+        """
+        rss = self.sample()
+        rss_values = [value for _, value in self.samples]
+        stats = {
+            'rss_bytes': rss,
+            'rss_low_bytes': min(rss_values) if rss_values else None,
+            'rss_high_bytes': max(rss_values) if rss_values else None,
+            'rss_samples': len(rss_values),
+            'gc_objects': len(gc.get_objects()),
+            'buffers': {name: list(value) for name, value in (buffers or {}).items()},
+        }
+        if not tracemalloc.is_tracing():
+            self.start_tracing()
+            self.snapshot()
+            stats['tracing'] = 'started'
+            return stats
+
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot, previous = self.snapshot()
+        stats.update(
+            tracing='on',
+            traced_bytes=current,
+            traced_peak_bytes=peak,
+            top=_sites(snapshot.statistics('lineno'), limit),
+            since_last=_sites(snapshot.compare_to(previous, 'lineno'), limit, diff=True) if previous else [],
+            since_start=_sites(snapshot.compare_to(self.baseline, 'lineno'), limit, diff=True),
+        )
+        return stats
+
+
+def format_report(stats):
+    """Text report of a MemoryMonitor.stats() dict (also as decoded from the daemon's JSON)"""
+    lines = [f"RSS: {format_bytes(stats['rss_bytes'])}"]
+    if stats.get('rss_samples', 0) > 1:
+        lines[0] += (f" (range {format_bytes(stats['rss_low_bytes'])} - {format_bytes(stats['rss_high_bytes'])}"
+                     f" over {stats['rss_samples']} samples)")
+    lines.append(f"Python objects: {stats['gc_objects']}")
+    if stats.get('buffers'):
+        lines.append("")
+        lines.append("buffers (size / limit):")
+        for name, (size, limit) in sorted(stats['buffers'].items()):
+            lines.append(f"  {name}: {size} / {limit if limit is not None else '-'}")
+    if stats.get('tracing') != 'on':
+        lines.append("")
+        lines.append("tracemalloc started; open this report again for allocators and diffs")
+        return "\n".join(lines)
+
+    lines.append(f"traced: {format_bytes(stats['traced_bytes'])} (peak {format_bytes(stats['traced_peak_bytes'])})")
+    sections = (('top allocators', 'top', False), ('since last report', 'since_last', True),
+                ('since tracing started', 'since_start', True))
+    for title, key, diff in sections:
+        lines.append("")
+        lines.append(f"{title}:")
+        for site in stats[key]:
+            if diff:
+                lines.append(f"  {format_bytes(site['size_diff_bytes']):>9} {site['count_diff']:+7d}  "
+                             f"{_short_path(site['where'])}")
+            else:
+                lines.append(f"  {format_bytes(site['size_bytes']):>9} {site['count']:7d}  "
+                             f"{_short_path(site['where'])}")
+        if not stats[key]:
+            lines.append("  none")
+    return "\n".join(lines)
+
+
+def _short_path(where):
+    """Trim a file:line location to its last two path components"""
+    path, _, line = where.rpartition(':')
+    parts = path.replace('\\', '/').split('/')
+    return f"{'/'.join(parts[-2:])}:{line}"
+
+
+def simulate(days=7, corrections_per_day=300, tips_per_day=64, out=print):
+    """Run a week of hotkey corrections and tip cycles offline and return True if memory stayed flat
+
+    Corrections go through a CorrectionEngine with the stub model, the
+    correction cache, the history and metrics in a temporary folder; tips
+    go through a TipBank and the markdown converter. Traced memory is
+    compared day by day after the first day, which fills the caches.
+    """
+    from correction_cache import CorrectionCache
+    from correction_engine import CorrectionEngine
+    from correction_history import CorrectionHistory
+    from markdown_text import markdown_to_plain_text
+    from metrics import CorrectionTrace, Metrics
+    from selection_edit import plan_edits
+    from stub_model import StubModel
+    from tip_bank import TipBank
+
+    directory = tempfile.mkdtemp(prefix="memory-sim-")
+    rng = random.Random(7)
+    words = ("i", "we", "has", "have", "send", "sended", "the", "a", "report", "meeting", "tomorrow",
+             "yesterday", "please", "check", "attached", "file", "thanks", "for", "your", "help", "team",
+             "update", "project", "deadline", "client", "call", "moved", "to", "friday", "monday")
+    monitor = MemoryMonitor()
+    monitor.start_tracing()
+    metrics = Metrics(os.path.join(directory, "metrics.jsonl"))
+    cache = CorrectionCache(os.path.join(directory, "corrections.sqlite3"))
+    history = CorrectionHistory(os.path.join(directory, "history.sqlite3"))
+    engine = CorrectionEngine(lambda: StubModel(), cache=cache, metrics=metrics, history=history)
+    bank = TipBank(os.path.join(directory, "tips.json"))
+    tip_serial = 0
+    day_traced = []
+    try:
+        out(f"{'day':>3} {'rss':>10} {'traced':>10} {'growth':>10}")
+        for day in range(1, days + 1):
+            for _ in range(corrections_per_day):
+                text = " ".join(rng.choice(words) for _ in range(rng.randint(4, 30)))
+                request = engine.submit(text, trace=CorrectionTrace())
+                corrected = request.future.result()
+                if corrected:
+                    plan_edits(text, corrected)
+                metrics.record(request.trace)
+            for _ in range(tips_per_day):
+                if len(bank) < 2:
+                    batch = []
+                    for _ in range(5):
+                        tip_serial += 1
+                        batch.append(f"**Tip {tip_serial}:** say *\"{rng.choice(words)}\"* politely.")
+                    bank.add(batch)
+                tip = bank.pop()
+                if tip:
+                    markdown_to_plain_text(tip)
+
+            gc.collect()
+            traced = tracemalloc.get_traced_memory()[0]
+            day_traced.append(traced)
+            growth = traced - day_traced[0]
+            out(f"{day:>3} {format_bytes(current_rss()):>10} {format_bytes(traced):>10} {format_bytes(growth):>10}")
+            monitor.snapshot()
+
+        per_day = (day_traced[-1] - day_traced[0]) / max(1, days - 1)
+        flat = per_day < MAX_DAILY_GROWTH
+        out(f"traced growth after day 1: {format_bytes(per_day)} per day "
+            f"({'flat' if flat else 'GROWING'}, limit {format_bytes(MAX_DAILY_GROWTH)})")
+        if not flat:
+            out("largest growth since day 1:")
+            for site in _sites(monitor.previous.compare_to(monitor.baseline, 'lineno'), TOP_ALLOCATORS, diff=True):
+                out(f"  {format_bytes(site['size_diff_bytes']):>9} {site['where']}")
+        return flat
+    finally:
+        engine.shutdown()
+        cache.close()
+        history.close()
+        monitor.stop_tracing()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def add_arguments(parser):
+    """Add the memory report options to an argparse parser"""
+    parser.add_argument('--url', help="address of the correction daemon to report on (default: the daemon's default)")
+    parser.add_argument('--simulate', type=int, metavar='DAYS', default=0,
+                        help='run DAYS of simulated hotkey and tip cycles offline and check memory stays flat')
+    parser.add_argument('--corrections-per-day', type=int, default=300)
+    parser.add_argument('--tips-per-day', type=int, default=64)
+
+
+def run(args):
+    """Entry point for 'main.py memory'; returns the process exit code
+
+    Reports on the running correction daemon, or with --simulate checks
+    that memory stays flat over simulated days of use.
+    """
+    if args.simulate:
+        return 0 if simulate(args.simulate, args.corrections_per_day, args.tips_per_day) else 1
+    from correction_daemon import DaemonClient, DaemonError
+    try:
+        stats = DaemonClient(args.url).memory()
+    except DaemonError as e:
+        print(f"Error: {e} (start it with 'main.py serve', or use --simulate)", file=sys.stderr)
+        return 1
+    print(format_report(stats))
+    return 0
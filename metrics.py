@@ -0,0 +1,195 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+# Timestamps recorded for each correction, in the order they normally happen
+MARKS = (
+    'hotkey',
+    'window_visible',
+    'submit',
+    'request_sent',
+    'first_token',
+    'response_complete',
+    'typing_start',
+    'typing_done',
+)
+
+# Spans derived from the marks: (name, start mark, end mark)
+SPANS = (
+    ('hotkey_to_visible', 'hotkey', 'window_visible'),
+    ('queue_wait', 'submit', 'request_sent'),
+    ('first_token', 'request_sent', 'first_token'),
+    ('response', 'request_sent', 'response_complete'),
+    ('typing_wait', 'response_complete', 'typing_start'),
+    ('typing', 'typing_start', 'typing_done'),
+    ('submit_to_typed', 'submit', 'typing_done'),
+)
+
+PERCENTILES = (50, 95, 99)
+
+# Distinct counters and histograms kept; names past this are dropped so they cannot grow without end
+MAX_SERIES = 256
+
+# Counters that are always reported, even before anything was counted
+COUNTERS = ('requests', 'cache_hits', 'cache_misses', 'retries', 'bytes_sent', 'bytes_received',
+            'prompt_tokens', 'response_tokens')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class CorrectionTrace:
+    """perf_counter timestamps for one correction, from hotkey to typed text
+
+    Marks are set once; later calls for the same mark are ignored, so the
+    first chunk, token or write is what gets recorded.
+    """
+
+    def __init__(self):
+        self.marks = {}
+        self.info = {}  # Extra fields written with the trace (mode, cache hit, sizes)
+
+    def mark(self, name, at=None):
+        if name not in self.marks:
+            self.marks[name] = at if at is not None else time.perf_counter()
+
+    def spans(self):
+        """Return the duration in seconds of every span whose marks are both set"""
+        spans = {}
+        for name, start, end in SPANS:
+            if start in self.marks and end in self.marks:
+                spans[name] = self.marks[end] - self.marks[start]
+        return spans
+
+    def to_dict(self):
+        """Marks as ms offsets from the first one, plus spans in ms"""
+        origin = min(self.marks.values()) if self.marks else 0.0
+        return {
+            **self.info,
+            'marks_ms': {name: round((self.marks[name] - origin) * 1000, 2)
+                         for name in MARKS if name in self.marks},
+            'spans_ms': {name: round(value * 1000, 2) for name, value in self.spans().items()},
+        }
+
+
+class Metrics:
+    """Span histograms and counters, with finished traces appended to a rotating JSONL file
+
+    With no path the metrics are kept in memory only.
+    """
+
+    def __init__(self, path=None, window=500, max_bytes=1_000_000, backup_count=3, max_series=MAX_SERIES):
+        self.samples = {}  # span name -> recent durations in seconds
+        self.window = window
+        self.max_series = max_series
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.lock = threading.Lock()
+        self.logger = None
+        if path:
+            self.logger = logging.getLogger(f"fix_my_english.metrics.{id(self)}")
+            self.logger.propagate = False
+            self.logger.setLevel(logging.INFO)
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                          encoding='utf-8', delay=True)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.logger.addHandler(handler)
+
+    def count(self, name, amount=1):
+        """Add to a named counter"""
+        with self.lock:
+            if name not in self.counters and len(self.counters) >= self.max_series:
+                return
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def count_tokens(self, response, trace=None, prefix=''):
+        """Add a response's usage metadata (if the model reports it) to the token counters"""
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is None:
+            return
+        tokens = {
+            'prompt_tokens': getattr(usage, 'prompt_token_count', 0) or 0,
+            'response_tokens': getattr(usage, 'candidates_token_count', 0) or 0,
+            'cached_tokens': getattr(usage, 'cached_content_token_count', 0) or 0,
+        }
+        for name, amount in tokens.items():
+            if amount:
+                self.count(prefix + name, amount)
+        if trace is not None:
+            for name, amount in tokens.items():
+                trace.info[name] = trace.info.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        """Add one duration sample to a span histogram"""
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                if len(self.samples) >= self.max_series:
+                    return
+                samples = self.samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def record(self, trace, outcome='ok'):
+        """Store a finished trace in the histograms and the JSONL file"""
+        for name, seconds in trace.spans().items():
+            self.observe(name, seconds)
+        self.count(f'corrections_{outcome}')
+        if self.logger is not None:
+            entry = {'time': round(time.time(), 3), 'outcome': outcome, **trace.to_dict()}
+            try:
+                self.logger.info(json.dumps(entry, ensure_ascii=False))
+            except Exception as e:
+                print(f"Error writing metrics: {e}")
+
+    def histograms(self):
+        """Return {span: {'count', 'p50', 'p95', 'p99'}} with times in seconds"""
+        with self.lock:
+            samples = {name: sorted(values) for name, values in self.samples.items()}
+        result = {}
+        for name, values in samples.items():
+            row = {'count': len(values)}
+            for pct in PERCENTILES:
+                row[f'p{pct}'] = percentile(values, pct)
+            result[name] = row
+        return result
+
+    def snapshot(self):
+        """Return the histograms and counters as plain data"""
+        with self.lock:
+            counters = dict(self.counters)
+        return {'spans': self.histograms(), 'counters': counters}
+
+    def summary(self):
+        """Return a text table of span percentiles and counters"""
+        histograms = self.histograms()
+        lines = [f"{'span':<18} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"]
+        ordered = [name for name, _, _ in SPANS] + sorted(set(histograms) - {name for name, _, _ in SPANS})
+        for name in ordered:
+            row = histograms.get(name)
+            if row is None:
+                continue
+            values = " ".join(f"{row[f'p{pct}'] * 1000:9.1f}" for pct in PERCENTILES)
+            lines.append(f"{name:<18} {row['count']:>5} {values}")
+        if len(lines) == 1:
+            lines.append("no samples yet")
+        with self.lock:
+            counters = sorted(self.counters.items())
+        if counters:
+            lines.append("")
+            lines.extend(f"{name}: {value}" for name, value in counters)
+        return "\n".join(lines)
+
+    def close(self):
+        """Close the JSONL file"""
+        if self.logger is not None:
+            for handler in list(self.logger.handlers):
+                self.logger.removeHandler(handler)
+                handler.close()
+            self.logger = None
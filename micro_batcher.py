@@ -0,0 +1,148 @@
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Prompt for several short texts at once; every text is introduced by its marker line
+# (the model's system instruction already says how to improve a text)
+BATCH_PROMPT = """Improve each numbered text below on its own.
+Respond with every marker line exactly as given, each followed by ONLY the improved version of that text.
+
+{items}"""
+
+ITEM_MARKER = "<<<{index}>>>"
+ITEM_MARKER_LINE = re.compile(r'^[ \t]*<<<(\d+)>>>[ \t]*$', re.MULTILINE)
+
+
+def build_batch_prompt(texts):
+    """Build one prompt holding all texts, numbered from 1"""
+    items = "\n".join(f"{ITEM_MARKER.format(index=index)}\n{text}" for index, text in enumerate(texts, 1))
+    return BATCH_PROMPT.format(items=items)
+
+
+def split_batch_response(response, count):
+    """Split a batched response into count texts, or return None if it does not line up"""
+    markers = list(ITEM_MARKER_LINE.finditer(response))
+    if [int(match.group(1)) for match in markers] != list(range(1, count + 1)):
+        return None
+    parts = []
+    for match, following in zip(markers, markers[1:] + [None]):
+        end = following.start() if following else len(response)
+        parts.append(response[match.end():end])
+    if any(not part.strip() for part in parts):
+        return None
+    return parts
+
+
+class _Item:
+    def __init__(self, text, trace):
+        self.text = text
+        self.trace = trace
+        self.future = Future()
+
+
+class MicroBatcher:
+    """Collects short corrections for a few milliseconds and sends them as one request
+
+    A batch is sent when it holds max_items texts or window seconds after
+    its first text arrived, whichever comes first. If the response cannot
+    be split back into one answer per text, each text is corrected on its
+    own instead.
+    """
+
+    def __init__(self, send_prompt, correct_one, clean, window=0.02, max_items=8, max_item_chars=300,
+                 max_batches_in_flight=2):
+        # send_prompt(prompt, traces) returns the raw response text, correct_one(text, trace)
+        # corrects a single text and clean(text) post-processes one answer from a batch
+        self.send_prompt = send_prompt
+        self.correct_one = correct_one
+        self.clean = clean
+        self.window = window
+        self.max_items = max_items
+        self.max_item_chars = max_item_chars  # Longer texts are not worth batching
+        self.executor = ThreadPoolExecutor(max_workers=max_batches_in_flight, thread_name_prefix="batch")
+        self.lock = threading.Lock()
+        self.items = []
+        self.timer = None
+
+        # Counters
+        self.batches = 0
+        self.batched_items = 0
+        self.fallbacks = 0
+
+    def accepts(self, text):
+        return len(text) <= self.max_item_chars
+
+    def submit(self, text, trace=None):
+        """Queue text for the next batch and return a Future for its correction"""
+        item = _Item(text, trace)
+        with self.lock:
+            self.items.append(item)
+            if len(self.items) >= self.max_items:
+                self._flush_locked()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.window, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        return item.future
+
+    def correct(self, text, trace=None):
+        """Correct text as part of a batch, blocking until its answer is in"""
+        return self.submit(text, trace).result()
+
+    def flush(self):
+        """Send whatever is waiting now"""
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        items, self.items = self.items, []
+        if items:
+            self.executor.submit(self._send, items)
+
+    def _send(self, items):
+        """Correct one batch (batch threads)"""
+        if len(items) == 1:
+            self._resolve_each(items)
+            return
+        try:
+            response = self.send_prompt(build_batch_prompt([item.text for item in items]),
+                                        [item.trace for item in items])
+            parts = split_batch_response(response, len(items))
+        except Exception as e:
+            print(f"Error in batched correction, correcting one by one: {e}")
+            parts = None
+        if parts is None:
+            with self.lock:
+                self.fallbacks += 1
+            self._resolve_each(items)
+            return
+        with self.lock:
+            self.batches += 1
+            self.batched_items += len(items)
+        for item, part in zip(items, parts):
+            item.future.set_result(self.clean(part))
+
+    def _resolve_each(self, items):
+        for item in items:
+            try:
+                item.future.set_result(self.correct_one(item.text, item.trace))
+            except Exception as e:
+                item.future.set_exception(e)
+
+    def stats(self):
+        """Return how many batches were sent and how full they were"""
+        with self.lock:
+            return {
+                'batches': self.batches,
+                'batched_items': self.batched_items,
+                'average_batch_size': self.batched_items / self.batches if self.batches else 0.0,
+                'fallbacks': self.fallbacks,
+                'waiting': len(self.items),
+            }
+
+    def shutdown(self):
+        self.flush()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import Counter
+
+# Configured models, fastest first: (name, quality rank, expected seconds per call before any are measured)
+MODELS = (
+    ('gemini-2.0-flash-lite', 1, 0.6),
+    ('gemini-2.0-flash', 2, 0.9),
+    ('gemini-2.5-flash', 3, 2.5),
+)
+
+# 'fastest' sends everything to the model answering quickest right now; 'quality' sends
+# longer texts to the best model that is healthy. Short texts always take the fastest path.
+POLICIES = ('fastest', 'quality')
+
+# Texts up to this many characters count as short
+SHORT_CHARS = 200
+
+# A model failing more often than this (EWMA) is skipped while another one is healthy,
+# until RETRY_AFTER seconds after its last failure
+MAX_ERROR_RATE = 0.5
+RETRY_AFTER = 30.0
+
+# A latency average not updated for this many seconds is halfway back to the prior, so a
+# model pushed off the fast path by one slow call is tried again once the average is stale
+RECOVERY_HALF_LIFE = 300.0
+
+
+def size_class(chars):
+    return 'short' if chars <= SHORT_CHARS else 'long'
+
+
+class ModelStats:
+    """Exponentially weighted latency per size class and error rate of one model"""
+
+    def __init__(self, prior_latency, alpha=0.2):
+        self.alpha = alpha
+        self.prior = {'short': prior_latency, 'long': prior_latency * 2}
+        self.latency = dict(self.prior)
+        self.updated_at = {size: time.monotonic() for size in self.prior}
+        self.error_rate = 0.0
+        self.failed_at = None
+        self.calls = 0
+
+    @property
+    def healthy(self):
+        return (self.error_rate <= MAX_ERROR_RATE or self.failed_at is None
+                or time.monotonic() - self.failed_at >= RETRY_AFTER)
+
+    def estimate(self, size):
+        """Latency average for size, drifting back to the prior while no calls update it"""
+        age = time.monotonic() - self.updated_at[size]
+        return self.prior[size] + (self.latency[size] - self.prior[size]) * 0.5 ** (age / RECOVERY_HALF_LIFE)
+
+    def update(self, size, seconds, ok):
+        self.calls += 1
+        self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+        if ok:
+            latency = self.estimate(size)
+            self.latency[size] = latency + self.alpha * (seconds - latency)
+            self.updated_at[size] = time.monotonic()
+        else:
+            self.failed_at = time.monotonic()
+
+
+class ModelRouter:
+    """Holds one client per configured model and picks the model for each request
+
+    create_client(name) builds a client on first use. choose(chars) returns
+    the model name for a text of that length, record() feeds back how the
+    call went, and every decision is counted with its reason. available(name),
+    when given, returns False while calls to name would be refused (for
+    example while its circuit breaker is open); such models are skipped.
+    """
+
+    def __init__(self, create_client, models=MODELS, policy='fastest', metrics=None, alpha=0.2,
+                 available=None):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown routing policy: {policy}")
+        self.create_client = create_client
+        self.models = [name for name, _, _ in models]
+        self.quality = {name: quality for name, quality, _ in models}
+        self.policy = policy
+        self.metrics = metrics
+        self.available = available
+        self.lock = threading.Lock()
+        self.stats_by_model = {name: ModelStats(prior, alpha) for name, _, prior in models}
+        self.clients = {}
+        self.decisions = Counter()  # (model, reason) -> count
+
+    def client(self, name):
+        """Return the client for name, creating it on first use"""
+        with self.lock:
+            client = self.clients.get(name)
+        if client is None:
+            client = self.create_client(name)
+            with self.lock:
+                client = self.clients.setdefault(name, client)
+        return client
+
+    def choose(self, chars):
+        """Return the model name to use for a text of chars characters"""
+        size = size_class(chars)
+        # Asked outside the lock: it may take the caller's own lock
+        callable_now = [name for name in self.models if self.available is None or self.available(name)]
+        with self.lock:
+            healthy = ([name for name in callable_now if self.stats_by_model[name].healthy]
+                       or callable_now or self.models)
+            if size == 'short' or self.policy == 'fastest':
+                name = min(healthy, key=lambda n: self.stats_by_model[n].estimate(size))
+                reason = 'short' if size == 'short' else 'fastest'
+            else:
+                name = max(healthy, key=lambda n: self.quality[n])
+                reason = 'quality'
+            self.decisions[(name, reason)] += 1
+        if self.metrics is not None:
+            self.metrics.count(f'routed_{reason}')
+        return name
+
+    def record(self, name, chars, seconds, ok):
+        """Feed back the duration and success of a call to name"""
+        with self.lock:
+            self.stats_by_model[name].update(size_class(chars), seconds, ok)
+        if self.metrics is not None and ok:
+            self.metrics.observe(f'model:{name}', seconds)
+
+    def stats(self):
+        """Per-model EWMA latency, error rate and routing decisions"""
+        with self.lock:
+            return {
+                'policy': self.policy,
+                'models': {
+                    name: {
+                        'calls': stats.calls,
+                        'ewma_ms': {size: round(stats.estimate(size) * 1000, 1) for size in stats.latency},
+                        'error_rate': round(stats.error_rate, 3),
+                        'routed': {reason: count for (model, reason), count in self.decisions.items()
+                                   if model == name},
+                    }
+                    for name, stats in self.stats_by_model.items()
+                },
+            }
+
+    def summary(self):
+        """Text table of the routing stats"""
+        stats = self.stats()
+        lines = [f"routing policy: {stats['policy']}"]
+        for name, row in stats['models'].items():
+            routed = ", ".join(f"{reason} {count}" for reason, count in sorted(row['routed'].items())) or "none"
+            lines.append(f"{name}: short {row['ewma_ms']['short']:.0f} ms, long {row['ewma_ms']['long']:.0f} ms, "
+                         f"errors {row['error_rate']:.0%}, routed: {routed}")
+        return "\n".join(lines)
+
+
+def parse_models(value):
+    """Parse a --models option: comma-separated names ordered from fastest to best quality"""
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    priors = {name: prior for name, _, prior in MODELS}
+    return tuple((name, rank, priors.get(name, 1.0 + rank * 0.5)) for rank, name in enumerate(names, 1))
@@ -0,0 +1,275 @@
+import ctypes
+import sys
+import time
+
+# Sink used by the "auto" mode for texts shorter than the paste threshold
+DEFAULT_PASTE_THRESHOLD = 80
+
+
+class OutputSink:
+    """Base class for the ways corrected text can be sent to the focused app"""
+
+    name = 'base'
+
+    def __init__(self):
+        self.chars = 0
+        self.writes = 0
+        self.seconds = 0.0
+
+    def write(self, text):
+        """Send text to the target and record throughput"""
+        start = time.perf_counter()
+        self._write(text)
+        self.seconds += time.perf_counter() - start
+        self.chars += len(text)
+        self.writes += 1
+
+    def _write(self, text):
+        raise NotImplementedError
+
+    @property
+    def chars_per_second(self):
+        if not self.seconds:
+            return 0.0
+        return self.chars / self.seconds
+
+    def stats(self):
+        """Return throughput counters for this sink"""
+        return {
+            'sink': self.name,
+            'writes': self.writes,
+            'chars': self.chars,
+            'seconds': self.seconds,
+            'chars_per_second': self.chars_per_second,
+        }
+
+
+class PyAutoGuiSink(OutputSink):
+    """Types the text one key event per character with pyautogui"""
+
+    name = 'type'
+
+    def _write(self, text):
+        import pyautogui
+        # We use write instead of typewrite to handle special characters better
+        pyautogui.write(text)
+
+
+class ClipboardPasteSink(OutputSink):
+    """Pastes the text with Ctrl+V, then restores the previous clipboard
+
+    Pastes that follow each other within restore_delay (streamed chunks)
+    share one saved clipboard and one restore after the last of them.
+    """
+
+    name = 'paste'
+
+    def __init__(self, root, restore_delay=300):
+        super().__init__()
+        self.root = root
+        self.restore_delay = restore_delay  # ms to wait before the target has read the clipboard
+        self.saved = None  # The user's clipboard text while a restore is pending
+        self.restore_id = None
+
+    def _write(self, text):
+        import keyboard
+        if self.restore_id is None:
+            try:
+                self.saved = self.root.clipboard_get()
+            except Exception:
+                self.saved = None  # Empty clipboard or non-text content
+        else:
+            self.root.after_cancel(self.restore_id)  # The clipboard still holds our last paste
+
+        self.root.clipboard_clear()
+        self.root.clipboard_append(text)
+        keyboard.send('ctrl+v')
+        self.restore_id = self.root.after(self.restore_delay, self._restore)
+
+    def _restore(self):
+        """Put the saved clipboard content back"""
+        self.restore_id = None
+        saved, self.saved = self.saved, None
+        if saved is None:
+            return
+        try:
+            self.root.clipboard_clear()
+            self.root.clipboard_append(saved)
+        except Exception as e:
+            print(f"Error restoring clipboard: {e}")
+
+
+class BatchedKeySink(OutputSink):
+    """Injects unicode key events in batches with a single SendInput call each
+
+    Falls back to keyboard.write without delay on platforms without SendInput.
+    """
+
+    name = 'batched'
+
+    def __init__(self, batch_size=256):
+        super().__init__()
+        self.batch_size = batch_size
+
+    def _write(self, text):
+        if sys.platform != 'win32':
+            import keyboard
+            keyboard.write(text, delay=0)
+            return
+        for start in range(0, len(text), self.batch_size):
+            _send_unicode(text[start:start + self.batch_size])
+
+
+class NullSink(OutputSink):
+    """Discards the text; used to measure overhead without a target"""
+
+    name = 'null'
+
+    def _write(self, text):
+        pass
+
+
+class RecordingSink(OutputSink):
+    """Keeps everything written so tests and benchmarks can inspect it"""
+
+    name = 'recording'
+
+    def __init__(self, max_chunks=1000):
+        super().__init__()
+        self.max_chunks = max_chunks
+        self.chunks = []
+
+    def _write(self, text):
+        self.chunks.append(text)
+        if len(self.chunks) > self.max_chunks:
+            del self.chunks[0]
+
+    @property
+    def text(self):
+        return "".join(self.chunks)
+
+    def clear(self):
+        self.chunks = []
+
+
+class SinkRouter:
+    """Chooses a sink per write, by configured mode or by text length"""
+
+    def __init__(self, sinks, mode='auto', paste_threshold=DEFAULT_PASTE_THRESHOLD):
+        self.sinks = {sink.name: sink for sink in sinks}
+        self.mode = mode
+        self.paste_threshold = paste_threshold
+
+    def select(self, text):
+        """Return the sink that should handle text"""
+        if self.mode != 'auto':
+            return self.sinks[self.mode]
+        if len(text) >= self.paste_threshold and 'paste' in self.sinks:
+            return self.sinks['paste']
+        return self.sinks['type']
+
+    def write(self, text):
+        self.select(text).write(text)
+
+    def stats(self):
+        """Return throughput counters for every sink"""
+        return [sink.stats() for sink in self.sinks.values()]
+
+
+def press_key(key, count=1):
+    """Press a navigation key ('left', 'right', 'delete' or 'word_right' for Ctrl+Right) count times
+
+    On Windows all presses go out in one SendInput call.
+    """
+    if count <= 0:
+        return
+    if sys.platform != 'win32':
+        import keyboard
+        for _ in range(count):
+            keyboard.send('ctrl+right' if key == 'word_right' else key)
+        return
+    if key == 'word_right':
+        _send_virtual_key(VIRTUAL_KEYS['right'], count, modifier=VK_CONTROL)
+    else:
+        _send_virtual_key(VIRTUAL_KEYS[key], count)
+
+
+def measure_throughput(sink, text, repeats=3):
+    """Write text to a sink several times and return its characters per second"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        sink.write(text)
+    elapsed = time.perf_counter() - start
+    return len(text) * repeats / elapsed if elapsed else float('inf')
+
+
+# SendInput structures for BatchedKeySink (Windows only)
+INPUT_KEYBOARD = 1
+KEYEVENTF_EXTENDEDKEY = 0x0001
+KEYEVENTF_KEYUP = 0x0002
+KEYEVENTF_UNICODE = 0x0004
+
+# Virtual key codes for press_key; all of them are extended keys
+VIRTUAL_KEYS = {'left': 0x25, 'right': 0x27, 'delete': 0x2E}
+VK_CONTROL = 0x11
+
+
+class _KEYBDINPUT(ctypes.Structure):
+    _fields_ = [
+        ("wVk", ctypes.c_ushort),
+        ("wScan", ctypes.c_ushort),
+        ("dwFlags", ctypes.c_ulong),
+        ("time", ctypes.c_ulong),
+        ("dwExtraInfo", ctypes.POINTER(ctypes.c_ulong)),
+    ]
+
+
+class _MOUSEINPUT(ctypes.Structure):
+    _fields_ = [
+        ("dx", ctypes.c_long),
+        ("dy", ctypes.c_long),
+        ("mouseData", ctypes.c_ulong),
+        ("dwFlags", ctypes.c_ulong),
+        ("time", ctypes.c_ulong),
+        ("dwExtraInfo", ctypes.POINTER(ctypes.c_ulong)),
+    ]
+
+
+class _INPUTUNION(ctypes.Union):
+    # The mouse variant is the largest member and fixes the size of INPUT
+    _fields_ = [("ki", _KEYBDINPUT), ("mi", _MOUSEINPUT)]
+
+
+class _INPUT(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_ulong), ("union", _INPUTUNION)]
+
+
+def _send_unicode(text):
+    """Send key down/up events for every UTF-16 unit of text in one SendInput call"""
+    units = text.encode('utf-16-le')
+    codes = [int.from_bytes(units[i:i + 2], 'little') for i in range(0, len(units), 2)]
+    events = (_INPUT * (len(codes) * 2))()
+    for index, code in enumerate(codes):
+        for offset, flags in ((0, KEYEVENTF_UNICODE), (1, KEYEVENTF_UNICODE | KEYEVENTF_KEYUP)):
+            event = events[index * 2 + offset]
+            event.type = INPUT_KEYBOARD
+            event.union.ki.wScan = code
+            event.union.ki.dwFlags = flags
+    sent = ctypes.windll.user32.SendInput(len(events), events, ctypes.sizeof(_INPUT))
+    if sent != len(events):
+        raise OSError(f"SendInput injected {sent} of {len(events)} events")
+
+
+def _send_virtual_key(vk, count, modifier=None):
+    """Send count presses of an extended virtual key in one SendInput call, optionally with a modifier held"""
+    keys = [(vk, KEYEVENTF_EXTENDEDKEY), (vk, KEYEVENTF_EXTENDEDKEY | KEYEVENTF_KEYUP)] * count
+    if modifier is not None:
+        keys = [(modifier, 0)] + keys + [(modifier, KEYEVENTF_KEYUP)]
+    events = (_INPUT * len(keys))()
+    for event, (key, flags) in zip(events, keys):
+        event.type = INPUT_KEYBOARD
+        event.union.ki.wVk = key
+        event.union.ki.dwFlags = flags
+    sent = ctypes.windll.user32.SendInput(len(events), events, ctypes.sizeof(_INPUT))
+    if sent != len(events):
+        raise OSError(f"SendInput injected {sent} of {len(events)} events")
@@ -0,0 +1,287 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import percentile
+
+# Error class names (google.api_core and transport errors) that are worth another attempt
+TRANSIENT_ERRORS = ('ServiceUnavailable', 'DeadlineExceeded', 'ResourceExhausted', 'TooManyRequests',
+                    'InternalServerError', 'Aborted', 'RetryError', 'TransportError')
+
+# Successful calls needed before the hedge delay is trusted
+MIN_HEDGE_SAMPLES = 20
+
+
+class CircuitOpenError(RuntimeError):
+    """Model calls keep failing; new calls are refused until the cool-down is over"""
+
+
+class CallTimeoutError(TimeoutError):
+    """A model call did not finish before its deadline"""
+
+
+class QueueTimeoutError(CallTimeoutError):
+    """A model call never got a worker before its deadline; says nothing about the model"""
+
+
+def is_transient(error):
+    """True when a failed call may succeed if it is simply tried again"""
+    return isinstance(error, OSError) or type(error).__name__ in TRANSIENT_ERRORS
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive transient failures
+
+    While open every call is refused. After reset_timeout seconds one trial
+    call is let through; its success closes the breaker, its failure opens
+    it again for another reset_timeout.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            if self.trial_running or time.monotonic() - self.opened_at >= self.reset_timeout:
+                return 'half_open'
+            return 'open'
+
+    @property
+    def available(self):
+        """True if allow() would let a call through now, without claiming the trial"""
+        with self.lock:
+            return (self.opened_at is None or not self.trial_running
+                    and time.monotonic() - self.opened_at >= self.reset_timeout)
+
+    def allow(self):
+        """Return True if a call may go out now"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if not self.trial_running and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self.trial_running = False
+
+    def release(self):
+        """End a trial call whose outcome says nothing about the model's health
+
+        The breaker keeps its state, so the next call becomes the new trial.
+        """
+        with self.lock:
+            self.trial_running = False
+
+
+class _Call:
+    """One model call whose timeout is measured from when it starts running, not when it is queued"""
+
+    def __init__(self, fn, attempt_timeout, deadline):
+        self.fn = fn
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.started = threading.Event()
+        self.started_at = None
+        self.timeout = None
+
+    def run(self):
+        self.started_at = time.monotonic()
+        self.timeout = min(self.attempt_timeout, self.deadline - self.started_at)
+        self.started.set()
+        if self.timeout <= 0:
+            raise QueueTimeoutError("model call deadline exceeded before a worker was free")
+        return self.fn(self.timeout)
+
+
+class ResilientCaller:
+    """Runs model calls with a deadline, jittered retries, a circuit breaker and optional hedging
+
+    call(fn) calls fn(timeout) on a worker thread, so a call that hangs past
+    its timeout is abandoned instead of blocking the caller. Transient
+    errors are retried with full-jitter exponential backoff while the
+    deadline allows. Each key (for example the model name) has its own
+    circuit breaker. With hedging a second identical call is sent when the
+    first one is slower than the recent p95, and whichever answers first
+    is used. Every call's outcome is counted in metrics.
+
+    An attempt's timeout starts when a worker picks it up, so max_workers
+    should cover every call that can run at once, hedges included. A call
+    still queued at the deadline fails without counting against the model.
+    """
+
+    def __init__(self, metrics, deadline=30.0, attempt_timeout=15.0, max_attempts=3, base_delay=0.25,
+                 max_delay=4.0, hedge=False, hedge_percentile=95, min_hedge_delay=0.25,
+                 max_workers=8):
+        self.metrics = metrics
+        self.deadline = deadline  # Seconds for the whole call, retries included
+        self.attempt_timeout = attempt_timeout  # Seconds for a single attempt
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breakers = {}  # key -> CircuitBreaker
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=200)  # Recent successful attempt durations
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-call")
+
+    def breaker(self, key=None):
+        """Return the circuit breaker for key, creating it on first use"""
+        with self.lock:
+            breaker = self.breakers.get(key)
+            if breaker is None:
+                breaker = self.breakers[key] = CircuitBreaker()
+            return breaker
+
+    def available(self, key=None):
+        """True unless key's circuit breaker would refuse a call right now"""
+        return self.breaker(key).available
+
+    def backoff(self, attempt):
+        """Full-jitter delay before retry number attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None while there is too little history"""
+        with self.lock:
+            values = sorted(self.latencies)
+        if len(values) < MIN_HEDGE_SAMPLES:
+            return None
+        return max(self.min_hedge_delay, percentile(values, self.hedge_percentile))
+
+    def call(self, fn, trace=None, hedge=None, key=None, stream=False):
+        """Return fn(timeout)'s result, retrying and hedging as configured
+
+        stream marks a call that returns as soon as its first chunk arrives;
+        it is never hedged and its latency is not a sample for the hedge delay.
+        """
+        hedge = False if stream else (self.hedge if hedge is None else hedge)
+        breaker = self.breaker(key)
+        started = time.monotonic()
+        deadline = started + self.deadline
+        attempts = 0
+        outcome = 'ok'
+        try:
+            while True:
+                if not breaker.allow():
+                    raise CircuitOpenError("the model is failing; calls are paused for a moment")
+                attempts += 1
+                try:
+                    result = self._attempt(fn, deadline, hedge, trace, stream)
+                except QueueTimeoutError:
+                    breaker.release()  # The model was never asked
+                    raise
+                except Exception as e:
+                    if not is_transient(e):
+                        # A bad request is not an outage, but a trial call must not stay open forever
+                        breaker.release()
+                        raise
+                    breaker.record_failure()
+                    delay = self.backoff(attempts)
+                    if attempts >= self.max_attempts or time.monotonic() + delay >= deadline:
+                        raise
+                    print(f"Model call failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                    self.metrics.count('retries')
+                    time.sleep(delay)
+                    continue
+                except BaseException:
+                    breaker.release()
+                    raise
+                breaker.record_success()
+                return result
+        except CircuitOpenError:
+            outcome = 'circuit_open'
+            raise
+        except TimeoutError:
+            outcome = 'timeout'
+            raise
+        except Exception as e:
+            outcome = 'transient_error' if is_transient(e) else 'error'
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            self.metrics.count(f'model_calls_{outcome}')
+            self.metrics.observe('model_call', elapsed)
+            if trace is not None:
+                trace.info.update(attempts=attempts, call_outcome=outcome)
+
+    def _attempt(self, fn, deadline, hedge, trace, stream=False):
+        """Run one attempt, plus its hedge when the first call is slow"""
+        if deadline <= time.monotonic():
+            raise CallTimeoutError("model call deadline exceeded")
+        call = _Call(fn, self.attempt_timeout, deadline)
+        primary = self.executor.submit(call.run)
+
+        # The attempt's clock starts once a worker picks the call up
+        if not call.started.wait(max(0.0, deadline - time.monotonic())) or call.timeout <= 0:
+            primary.cancel()
+            raise QueueTimeoutError("model call deadline exceeded before a worker was free")
+        started, timeout = call.started_at, call.timeout
+        pending = {primary}
+        delay = self.hedge_delay() if hedge else None
+        if delay is not None and delay < timeout:
+            done, _ = wait(pending, timeout=max(0.0, started + delay - time.monotonic()))
+            if not done:
+                self.metrics.count('hedged_requests')
+                pending.add(self.executor.submit(_Call(fn, self.attempt_timeout, started + timeout).run))
+
+        # The first success wins; an error only counts once every call has failed
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, started + timeout - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()  # A call that is already running is left to finish
+                    if future is not primary:
+                        self.metrics.count('hedge_wins')
+                        if trace is not None:
+                            trace.info['hedge_won'] = True
+                    if not stream:
+                        with self.lock:
+                            self.latencies.append(time.monotonic() - started)
+                    return future.result()
+                error = error or future.exception()
+        if error is not None and not pending:
+            raise error
+        raise CallTimeoutError(f"model call timed out after {timeout:.1f}s")
+
+    def stats(self):
+        """Breaker states and hedging threshold"""
+        delay = self.hedge_delay()
+        with self.lock:
+            breakers = dict(self.breakers)
+        return {
+            'circuits': {key or 'default': breaker.state for key, breaker in breakers.items()},
+            'hedging': self.hedge,
+            'hedge_delay_ms': round(delay * 1000, 1) if delay is not None else None,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
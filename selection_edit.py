@@ -0,0 +1,202 @@
+import difflib
+import os
+import re
+import time
+
+import keyboard
+
+# Words, runs of whitespace and single punctuation marks
+TOKEN = re.compile(r"\s+|\w+|[^\w\s]")
+
+# Estimated cost of replacing the selection by pasting, in key events: the
+# Ctrl+V itself plus the clipboard swap and restore around it
+PASTE_COST = 40
+
+# Pasting also drops the selection's formatting (bold, links in mail clients), so longer
+# selections are edited in place until the plan costs this many events per character
+PASTE_COST_PER_CHAR = 0.5
+
+# Plain words each followed by one space and then another plain word: Ctrl+Right
+# crosses each of them with one key event in every common editor. End is not used,
+# since in soft-wrapped text (most mail clients) it stops at the visual line end.
+WORD_JUMPS = re.compile(r"(?:[A-Za-z0-9]+ (?=[A-Za-z0-9]))+")
+
+# Modifier keys that must be released before Ctrl+C is sent
+MODIFIERS = ('alt', 'shift', 'windows')
+
+
+def tokenize(text):
+    return TOKEN.findall(text)
+
+
+class EditPlan:
+    """Keystrokes that turn the selected text into the corrected text in place
+
+    ops is a list of ('jump', words), ('move', chars), ('delete', chars) and
+    ('type', text), applied left to right from the start of the selection;
+    a jump is one Ctrl+Right per word. text is the
+    result of the plan, which keeps the original whitespace (line breaks
+    included) wherever the correction only changed spacing.
+    """
+
+    def __init__(self, ops, text, changed_words):
+        self.ops = ops
+        self.text = text
+        self.changed_words = changed_words
+
+    @property
+    def cost(self):
+        """Key events the plan sends: one per word jumped and per character moved, deleted or typed"""
+        total = 1  # Collapsing the selection to its start
+        for op, value in self.ops:
+            total += value if op != 'type' else len(value)
+        return total
+
+    def use_paste(self, paste_cost=PASTE_COST):
+        """True when pasting the whole text is cheaper than editing in place
+
+        Word jumps keep the cost of a few fixes low however long the
+        selection is, so long texts are only pasted when much of them changed.
+        """
+        return self.cost >= max(paste_cost, len(self.text) * PASTE_COST_PER_CHAR)
+
+
+def _whitespace_key(token):
+    return " " if token.isspace() else token
+
+
+def _add_moves(add, text, following=""):
+    """Cover skipped text with word jumps where they are safe and arrow keys elsewhere
+
+    following is the character after text, which decides whether the last
+    word of text can be jumped over too.
+    """
+    position = 0
+    for match in WORD_JUMPS.finditer(text + following[:1]):
+        if match.start() > position:
+            add('move', match.start() - position)
+        add('jump', match.group().count(" "))
+        position = match.end()
+    if position < len(text):
+        add('move', len(text) - position)
+
+
+def plan_edits(original, corrected):
+    """Build the EditPlan that turns original into corrected with the fewest typed characters"""
+    source = tokenize(original)
+    target = tokenize(corrected)
+    # Whitespace compares equal whatever it is made of, so line breaks survive
+    matcher = difflib.SequenceMatcher(None, [_whitespace_key(t) for t in source],
+                                      [_whitespace_key(t) for t in target], autojunk=False)
+    ops = []
+    result = []
+    changed_words = 0
+
+    def add(op, value):
+        if ops and ops[-1][0] == op:
+            ops[-1] = (op, ops[-1][1] + value)
+        else:
+            ops.append((op, value))
+
+    # Unchanged text is only skipped once the next edit is known, so word jumps
+    # can look one character past it; whatever is left after the last edit is never skipped
+    skipped = ""
+    offset = 0  # Characters of original covered so far
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        old = "".join(source[i1:i2])
+        new = "".join(target[j1:j2])
+        if tag == 'equal':
+            skipped += old
+            offset += len(old)
+            result.append(old)
+            continue
+        changed_words += max(i2 - i1, j2 - j1)
+        result.append(new)
+
+        # Only the part between a common prefix and suffix is deleted and retyped
+        prefix = os.path.commonprefix([old, new])
+        suffix = os.path.commonprefix([old[len(prefix):][::-1], new[len(prefix):][::-1]])[::-1]
+        skipped += prefix
+        offset += len(prefix)
+        _add_moves(add, skipped, original[offset:offset + 1])
+        removed = len(old) - len(prefix) - len(suffix)
+        if removed:
+            add('delete', removed)
+        if len(new) > len(prefix) + len(suffix):
+            add('type', new[len(prefix):len(new) - len(suffix)])
+        skipped = suffix
+        offset += len(old) - len(prefix)
+    return EditPlan(ops, "".join(result), changed_words)
+
+
+def apply_plan(plan, press, write):
+    """Send the plan's keystrokes; press(key, count) sends keys, write(text) types text"""
+    press('left', 1)  # Collapse the selection to its start
+    for op, value in plan.ops:
+        if op == 'jump':
+            press('word_right', value)
+        elif op == 'move':
+            press('right', value)
+        elif op == 'delete':
+            press('delete', value)
+        else:
+            write(value)
+
+
+class SelectionGrabber:
+    """Copies the focused app's selection through the clipboard without blocking Tk"""
+
+    def __init__(self, root, timeout=600, poll_interval=10):
+        self.root = root
+        self.timeout = timeout  # ms to wait for modifiers to be released and the copy to land
+        self.poll_interval = poll_interval
+        self.after_id = None
+
+    def grab(self, callback):
+        """Call callback(text) on the Tk thread; text is None when nothing was copied"""
+        self.cancel()
+        self._wait_for_modifiers(time.perf_counter(), callback)
+
+    def cancel(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def _elapsed_ms(self, started):
+        return (time.perf_counter() - started) * 1000
+
+    def _wait_for_modifiers(self, started, callback):
+        # Ctrl+C sent while the hotkey's Alt or Shift is still held would be a different shortcut
+        held = any(_is_pressed(key) for key in MODIFIERS)
+        if held and self._elapsed_ms(started) < self.timeout:
+            self.after_id = self.root.after(self.poll_interval, self._wait_for_modifiers, started, callback)
+            return
+        try:
+            previous = self.root.clipboard_get()
+        except Exception:
+            previous = None  # Empty clipboard or non-text content
+        self.root.clipboard_clear()
+        self.root.update_idletasks()  # Not update(): queued UI commands must not run mid-grab
+        keyboard.send('ctrl+c')
+        self._poll(time.perf_counter(), previous, callback)
+
+    def _poll(self, started, previous, callback):
+        try:
+            text = self.root.clipboard_get()
+        except Exception:
+            text = None
+        if not text and self._elapsed_ms(started) < self.timeout:
+            self.after_id = self.root.after(self.poll_interval, self._poll, started, previous, callback)
+            return
+        self.after_id = None
+        if previous is not None:
+            self.root.clipboard_clear()
+            self.root.clipboard_append(previous)
+        callback(text or None)
+
+
+def _is_pressed(key):
+    try:
+        return keyboard.is_pressed(key)
+    except Exception:
+        return False
@@ -4,6 +4,14 @@ setup(
     name='python-do-type',
     version='0.1',
     packages=find_packages(),
+    # The app is a set of top-level modules next to main.py
+    py_modules=[
+        'main', 'animation', 'app_paths', 'batch_correct', 'chunking', 'correction_cache',
+        'correction_daemon', 'correction_engine', 'correction_history', 'local_corrector',
+        'markdown_text', 'memory_monitor', 'metrics', 'micro_batcher', 'model_router', 'output_sinks',
+        'resilience', 'selection_edit', 'speculation', 'startup_profile', 'stub_model', 'tip_bank',
+        'tray_icons', 'ui_dispatcher', 'window_focus',
+    ],
     install_requires=[
         # Add your dependencies here
     ],
@@ -0,0 +1,162 @@
+import time
+from collections import OrderedDict
+
+from chunking import PARAGRAPH_BREAK, split_sentences
+from correction_cache import normalize_input
+
+
+def draft_sentences(text):
+    """Split a draft into the sentences that are corrected one by one"""
+    sentences = []
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        sentences.extend(split_sentences(paragraph.replace("\n", " ")))
+    return sentences
+
+
+class RateLimiter:
+    """Token bucket: rate tokens per minute, at most burst saved up"""
+
+    def __init__(self, rate=12, burst=4):
+        self.rate = rate / 60
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Take a token; return False when none is left"""
+        self._refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def refund(self):
+        """Give back a token that was not spent on a model request"""
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def wait_time(self):
+        """Seconds until the next token is available"""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class DraftSpeculator:
+    """Corrects the draft in the background while it is still being typed
+
+    Once typing pauses for delay ms, every sentence of the draft without a
+    result is submitted on its own, so editing one sentence only re-sends
+    that sentence. Requests for sentences that are no longer in the draft
+    are cancelled, and model requests are rate limited. resolve() hands
+    back the whole correction once every sentence of the submitted text is
+    ready, waiting for sentences that are still in flight. Runs on the Tk
+    thread.
+    """
+
+    def __init__(self, root, engine, get_text, delay=800, rate=12, burst=4, min_chars=12,
+                 max_results=256):
+        self.root = root
+        self.engine = engine
+        self.get_text = get_text  # Returns the current draft
+        self.delay = delay
+        self.min_chars = min_chars  # Sentences shorter than this wait for the real submit
+        self.limiter = RateLimiter(rate, burst)
+        self.max_results = max_results
+        self.results = OrderedDict()  # Normalized sentence -> correction
+        self.in_flight = {}  # Normalized sentence -> request
+        self.after_id = None
+        self.waiter = None  # (keys, callback) of a submitted draft waiting for its sentences
+
+    def schedule(self, event=None):
+        """Restart the debounce timer after an edit"""
+        self._cancel_timer()
+        self.after_id = self.root.after(self.delay, self.speculate)
+
+    def speculate(self):
+        """Submit the sentences of the current draft that have no result yet"""
+        self.after_id = None
+        keys = {}
+        for sentence in draft_sentences(self.get_text()):
+            keys.setdefault(normalize_input(sentence), sentence)
+
+        # Sentences edited away are not worth finishing
+        for key in [key for key in self.in_flight if key not in keys]:
+            self.in_flight.pop(key).cancel()
+            self.engine.metrics.count('speculative_cancelled')
+
+        for key, sentence in keys.items():
+            if key in self.results or key in self.in_flight or len(sentence) < self.min_chars:
+                continue
+            if not self.limiter.acquire():
+                self.engine.metrics.count('speculative_throttled')
+                self.after_id = self.root.after(int(self.limiter.wait_time() * 1000) + 1, self.speculate)
+                return
+            request = self.engine.submit(sentence, on_done=self.on_done, on_error=self.on_error,
+                                         replace=False)
+            if request.source != 'model':
+                self.limiter.refund()  # Answered from the cache without a model request
+            if not request.future.done():
+                self.in_flight[key] = request
+            self.engine.metrics.count('speculative_requests')
+
+    def on_done(self, request, corrected_text):
+        key = normalize_input(request.text)
+        if self.in_flight.get(key) is request:
+            del self.in_flight[key]
+        if not request.cancelled and corrected_text:
+            self.results[key] = corrected_text
+            self.results.move_to_end(key)
+            while len(self.results) > self.max_results:
+                self.results.popitem(last=False)
+        self._check_waiter()
+
+    def on_error(self, request, error):
+        key = normalize_input(request.text)
+        if self.in_flight.get(key) is request:
+            del self.in_flight[key]
+        print(f"Error in speculative correction: {error}")
+        self._check_waiter()
+
+    def resolve(self, text, callback):
+        """Use the speculative results for a submitted text
+
+        Returns False when some sentence was never sent, so text has to be
+        corrected normally. Otherwise callback(corrected_text) is called once
+        every sentence is ready, or callback(None) if one of them failed.
+        """
+        keys = [normalize_input(sentence) for sentence in draft_sentences(text)]
+        if not keys or any(key not in self.results and key not in self.in_flight for key in keys):
+            self.engine.metrics.count('speculative_misses')
+            return False
+        self.engine.metrics.count('speculative_hits')
+        self.waiter = (keys, callback)
+        self._check_waiter()
+        return True
+
+    def _check_waiter(self):
+        if self.waiter is None:
+            return
+        keys, callback = self.waiter
+        if any(key in self.in_flight and not self.in_flight[key].cancelled for key in keys):
+            return
+        self.waiter = None
+        if all(key in self.results for key in keys):
+            callback(" ".join(self.results[key] for key in keys))
+        else:
+            callback(None)
+
+    def stop(self):
+        """Stop speculating and drop the requests a submitted draft does not wait for"""
+        self._cancel_timer()
+        needed = self.waiter[0] if self.waiter else ()
+        for key in [key for key in self.in_flight if key not in needed]:
+            self.in_flight.pop(key).cancel()
+
+    def _cancel_timer(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
@@ -0,0 +1,48 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Time allowed from process start until the hotkey and tray are usable
+STARTUP_BUDGET_MS = 500
+
+
+class StartupProfiler:
+    """Records how long each import and initialisation phase takes"""
+
+    def __init__(self, started=None):
+        self.started = started or time.perf_counter()
+        self.phases = []  # (name, start offset, duration, thread name)
+        self.ready_at = None
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as a named phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+
+    def record(self, name, start, end):
+        """Record a phase from perf_counter timestamps"""
+        with self.lock:
+            self.phases.append((name, start - self.started, end - start, threading.current_thread().name))
+
+    def mark_ready(self):
+        """Note the moment the hotkey and tray became usable"""
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter() - self.started
+
+    def report(self):
+        """Return a table of the recorded phases"""
+        with self.lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+        lines = [f"{'phase':<32} {'start ms':>9} {'took ms':>9}  thread"]
+        for name, offset, duration, thread in phases:
+            lines.append(f"{name:<32} {offset * 1000:9.1f} {duration * 1000:9.1f}  {thread}")
+        if self.ready_at is not None:
+            ready_ms = self.ready_at * 1000
+            status = "within" if ready_ms <= STARTUP_BUDGET_MS else "OVER"
+            lines.append(f"ready after {ready_ms:.1f} ms ({status} the {STARTUP_BUDGET_MS} ms budget)")
+        return "\n".join(lines)
@@ -0,0 +1,65 @@
+"""Offline stand-in for the Gemini model, for benchmarks and the daemon's --stub mode"""
+import time
+
+
+class StubUsage:
+    """Token counts shaped like the SDK's usage_metadata, estimated at four characters a token"""
+
+    def __init__(self, prompt, text):
+        self.prompt_token_count = -(-len(prompt) // 4)
+        self.candidates_token_count = -(-len(text) // 4)
+        self.cached_content_token_count = 0
+        self.total_token_count = self.prompt_token_count + self.candidates_token_count
+
+
+class StubResponse:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class StubModel:
+    """Answers generate_content after a fixed latency without touching the network
+
+    The reply echoes the text after "The text is:" in the prompt (the
+    marked items of a batched prompt, or else the whole prompt), so
+    post-processing sees realistic input. Streaming
+    responses are split into chunk_size pieces with the latency spread
+    over them, the first piece arriving after first_chunk_share of it.
+    """
+
+    def __init__(self, latency=0.0, chunk_size=16, first_chunk_share=0.3, reply=None):
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.first_chunk_share = first_chunk_share
+        self.reply = reply  # Fixed reply text, or None to echo the input
+        self.calls = 0
+
+    def reply_for(self, prompt):
+        if self.reply is not None:
+            return self.reply
+        batch_start = prompt.find("<<<1>>>")
+        if batch_start >= 0:
+            return prompt[batch_start:]  # Batched prompt: echo every marker and text
+        marker = "The text is:"
+        index = prompt.rfind(marker)
+        return ' "' + (prompt[index + len(marker):].strip() if index >= 0 else prompt) + '"\n'
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        text = self.reply_for(prompt)
+        if stream:
+            return self._stream(prompt, text)
+        if self.latency:
+            time.sleep(self.latency)
+        return StubResponse(text, StubUsage(prompt, text))
+
+    def _stream(self, prompt, text):
+        pieces = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+        first_delay = self.latency * self.first_chunk_share
+        rest_delay = (self.latency - first_delay) / max(1, len(pieces) - 1)
+        for index, piece in enumerate(pieces):
+            delay = first_delay if index == 0 else rest_delay
+            if delay:
+                time.sleep(delay)
+            yield StubResponse(piece, StubUsage(prompt, text[:(index + 1) * self.chunk_size]))
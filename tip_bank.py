@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+
+from app_paths import data_path
+
+# Line that separates tips in a batched response
+TIP_DELIMITER = "===TIP==="
+
+# Instructions the tips model is configured with once
+TIPS_INSTRUCTION = """
+create tips (but not too short), about how to be speak as professional in english,
+for each tip give me an explanantion In indonesia Language , and show me the example.
+
+each tip should be not more than 300 characters.
+put a line containing only """ + TIP_DELIMITER + """ between the tips.
+"""
+
+# Prompt used to fetch several tips with one request
+TIPS_PROMPT = "create me {count} different tips"
+
+
+def split_tips(text):
+    """Split a batched response into individual tips"""
+    return [tip.strip() for tip in text.split(TIP_DELIMITER) if tip.strip()]
+
+
+def _fingerprint(tip):
+    """Hash used to recognise a tip that was already stored or shown"""
+    return hashlib.sha1(" ".join(tip.lower().split()).encode("utf-8")).hexdigest()
+
+
+class TipBank:
+    """Ring buffer of ready-to-show tips, persisted to disk with de-duplication"""
+
+    def __init__(self, path=None, capacity=20, seen_limit=500):
+        self.path = path or data_path("tips.json")
+        self.tips = deque(maxlen=capacity)
+        self.seen = deque(maxlen=seen_limit)  # Fingerprints of stored and shown tips
+        self.lock = threading.Lock()
+        self.load()
+
+    def __len__(self):
+        return len(self.tips)
+
+    def load(self):
+        """Load the saved tips, ignoring a missing or corrupt file"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self.lock:
+            self.seen.extend(data.get('seen', []))
+            self.tips.extend(data.get('tips', []))
+
+    def save(self):
+        """Write the bank to disk atomically"""
+        with self.lock:
+            data = {'tips': list(self.tips), 'seen': list(self.seen)}
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Error saving tips: {e}")
+
+    def add(self, tips):
+        """Add new tips, skipping any already stored or shown; return how many were added"""
+        added = 0
+        with self.lock:
+            for tip in tips:
+                fingerprint = _fingerprint(tip)
+                if fingerprint in self.seen:
+                    continue
+                self.seen.append(fingerprint)
+                self.tips.append(tip)
+                added += 1
+        if added:
+            self.save()
+        return added
+
+    def pop(self):
+        """Take the oldest ready tip, or None when the bank is empty"""
+        with self.lock:
+            tip = self.tips.popleft() if self.tips else None
+        if tip is not None:
+            self.save()
+        return tip
+
+
+class TipPrefetcher:
+    """Keeps the tip bank topped up from a background thread"""
+
+    def __init__(self, bank, fetch_tips, batch_size=5, low_water=2):
+        # fetch_tips(count) returns a list of tips; it runs off the Tk thread
+        self.bank = bank
+        self.fetch_tips = fetch_tips
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def ensure_filled(self):
+        """Start a background fetch if the bank is running low"""
+        if len(self.bank) > self.low_water:
+            return
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._fill, daemon=True)
+            self.thread.start()
+
+    def _fill(self):
+        """Fetch one batch of tips into the bank"""
+        try:
+            tips = self.fetch_tips(self.batch_size)
+            self.bank.add(tips)
+        except Exception as e:
+            print(f"Error prefetching tips: {e}")
@@ -0,0 +1,131 @@
+import os
+
+from app_paths import data_path
+
+# Bump when the drawing below changes so cached files are rendered again
+ICON_VERSION = 1
+ICON_SIZE = 64
+
+# Background colour per tray state
+STATE_COLORS = {
+    'idle': "#3498db",
+    'busy': "#f39c12",
+    'error': "#e74c3c",
+    'offline': "#7f8c8d",
+}
+
+# Busy icons show the number of corrections in flight up to this, then "N+"
+MAX_BADGE = 9
+
+FONT_NAMES = ("arial.ttf", "segoeui.ttf", "DejaVuSans-Bold.ttf", "DejaVuSans.ttf")
+
+
+def icon_variants():
+    """Every (state, count) pair the tray can show"""
+    variants = [(state, 0) for state in STATE_COLORS if state != 'busy']
+    variants.extend(('busy', count) for count in range(1, MAX_BADGE + 1))
+    return variants
+
+
+def load_font(size):
+    """First TrueType font found, else Pillow's built-in one"""
+    from PIL import ImageFont
+    for name in FONT_NAMES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()  # Pillow before 10.1 has a single fixed size
+
+
+def draw_centered(dc, box, text, font, fill):
+    """Draw text centered in box using its actual bounding box"""
+    left, top, right, bottom = dc.textbbox((0, 0), text, font=font)
+    x = box[0] + (box[2] - box[0] - (right - left)) / 2 - left
+    y = box[1] + (box[3] - box[1] - (bottom - top)) / 2 - top
+    dc.text((x, y), text, fill=fill, font=font)
+
+
+def render_icon(state, size=ICON_SIZE, count=0):
+    """Draw the tray icon for a state; busy icons carry a badge with count"""
+    from PIL import Image, ImageDraw
+
+    image = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    dc = ImageDraw.Draw(image)
+    dc.rounded_rectangle([0, 0, size - 1, size - 1], radius=size * 15 // 64, fill=STATE_COLORS[state])
+    draw_centered(dc, (0, 0, size, size), "F", load_font(size // 2), "white")
+
+    if state == 'busy' and count:
+        badge = size * 28 // 64
+        box = (size - badge, 0, size - 1, badge - 1)
+        dc.ellipse(box, fill="white")
+        label = str(count) if count < MAX_BADGE else f"{MAX_BADGE}+"
+        draw_centered(dc, box, label, load_font(badge * 2 // 3 if len(label) == 1 else badge // 2),
+                      STATE_COLORS['busy'])
+    elif state in ('error', 'offline'):
+        # A small mark in the corner tells the states apart without relying on colour
+        mark = size * 20 // 64
+        box = (size - mark, size - mark, size - 1, size - 1)
+        dc.ellipse(box, fill="white")
+        draw_centered(dc, box, "!" if state == 'error' else "-", load_font(mark * 3 // 4), STATE_COLORS[state])
+    return image
+
+
+class TrayIconCache:
+    """Tray icons rendered once and kept as PNG files keyed on state, size and version
+
+    get() never draws once preload() has run, so switching icons costs no
+    rendering. Files from an older ICON_VERSION are simply not used.
+    """
+
+    def __init__(self, size=ICON_SIZE, directory=None):
+        self.size = size
+        self.directory = directory or data_path("icons")
+        self.images = {}
+        self.rendered = 0  # Icons drawn in this session rather than loaded from disk
+
+    def path(self, state, count=0):
+        name = state if not count else f"{state}-{count}"
+        return os.path.join(self.directory, f"tray-{name}-{self.size}-v{ICON_VERSION}.png")
+
+    def preload(self):
+        """Load every icon variant, rendering and saving the ones that are missing"""
+        for state, count in icon_variants():
+            self.get(state, count)
+
+    def get(self, state, count=0):
+        """Return the icon image for a state (and busy count)"""
+        if state == 'busy':
+            count = max(1, min(count, MAX_BADGE))
+        else:
+            count = 0
+        key = (state, count)
+        image = self.images.get(key)
+        if image is None:
+            image = self.images[key] = self._load_or_render(state, count)
+        return image
+
+    def _load_or_render(self, state, count):
+        from PIL import Image
+
+        path = self.path(state, count)
+        try:
+            with Image.open(path) as image:
+                image.load()
+                if image.size == (self.size, self.size):
+                    return image.copy()
+        except (OSError, ValueError):
+            pass  # Not cached yet, or unreadable
+        image = render_icon(state, self.size, count)
+        self.rendered += 1
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = path + ".tmp"
+            image.save(temp_path, format='PNG')
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error caching tray icon: {e}")
+        return image
@@ -0,0 +1,69 @@
+import queue
+import threading
+import tkinter as tk
+
+# Virtual event that wakes the Tk loop when commands are queued
+WAKEUP_EVENT = "<<DispatchCommands>>"
+
+
+class UiDispatcher:
+    """Thread-safe command queue drained on the Tk thread
+
+    Any thread may post() a callable; the Tk loop runs queued commands in
+    order. A single virtual event wakes the loop, and posts made while a
+    wakeup is already pending share it, so nothing polls.
+    """
+
+    def __init__(self, root, event=WAKEUP_EVENT):
+        self.root = root
+        self.event = event
+        self.commands = queue.SimpleQueue()
+        self.wakeup_pending = threading.Event()
+        self.wakeups = 0
+        self.executed = 0
+        root.bind(event, self.drain)
+
+    def post(self, fn, *args):
+        """Queue fn(*args) to run on the Tk thread"""
+        # The command is queued before the flag is checked, so a drain that
+        # already cleared the flag either sees it or is followed by a new wakeup
+        self.commands.put((fn, args))
+        if self.wakeup_pending.is_set():
+            return
+        self.wakeup_pending.set()
+        try:
+            self.root.event_generate(self.event, when='tail')
+        except (RuntimeError, tk.TclError) as e:
+            # The loop is not running yet (or is gone); the next drain picks it up
+            self.wakeup_pending.clear()
+            print(f"Error waking the UI thread: {e}")
+
+    def wrap(self, fn):
+        """Return a no-argument callback that posts fn, for use from other threads"""
+        def callback():
+            self.post(fn)
+        return callback
+
+    def drain(self, event=None):
+        """Run every queued command (Tk thread)"""
+        self.wakeup_pending.clear()
+        self.wakeups += 1
+        while True:
+            try:
+                fn, args = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            self.executed += 1
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Error in UI command {getattr(fn, '__name__', fn)}: {e}")
+
+    def stats(self):
+        """Return how many wakeups and commands were processed"""
+        return {
+            'wakeups': self.wakeups,
+            'commands': self.executed,
+            'queued': self.commands.qsize(),
+        }
+
@@ -0,0 +1,70 @@
+import time
+
+try:
+    import win32gui
+except ImportError:  # Not on Windows, or pywin32 is missing
+    win32gui = None
+
+
+def get_foreground_window():
+    """Return the handle of the focused top-level window, or None if unknown"""
+    if win32gui is None:
+        return None
+    try:
+        return win32gui.GetForegroundWindow() or None
+    except Exception:
+        return None
+
+
+class FocusWatcher:
+    """Detects when focus is back on the window that was active before the popup"""
+
+    def __init__(self, root, poll_interval=10, timeout=1000, fallback_delay=300):
+        self.root = root
+        self.poll_interval = poll_interval  # ms between foreground checks
+        self.timeout = timeout  # ms before typing anyway
+        self.fallback_delay = fallback_delay  # ms to wait when focus cannot be queried
+        self.target = None
+        self.after_id = None
+        self.last_wait = None  # Seconds the last wait took
+
+    def capture_target(self):
+        """Remember the currently focused window as the typing target"""
+        self.target = get_foreground_window()
+
+    def restore_focus(self):
+        """Ask Windows to give focus back to the target window"""
+        if win32gui is None or self.target is None:
+            return
+        try:
+            win32gui.SetForegroundWindow(self.target)
+        except Exception:
+            pass  # Windows may refuse; polling still detects the user's own switch
+
+    def wait_for_target(self, callback):
+        """Call callback on the Tk thread once the target window has focus again"""
+        self.cancel()
+        started = time.perf_counter()
+        if self.target is None:
+            self.after_id = self.root.after(self.fallback_delay, self._done, started, callback)
+            return
+        self.restore_focus()
+        self._poll(started, callback)
+
+    def cancel(self):
+        """Stop waiting without calling the callback"""
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def _poll(self, started, callback):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if get_foreground_window() == self.target or elapsed_ms >= self.timeout:
+            self._done(started, callback)
+            return
+        self.after_id = self.root.after(self.poll_interval, self._poll, started, callback)
+
+    def _done(self, started, callback):
+        self.after_id = None
+        self.last_wait = time.perf_counter() - started
+        callback()